@@ -1,15 +1,33 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from app.core.config import settings
 from app.core.database import get_database
+from app.core.cache import TTLCache
+from app.core.security import decode_access_token
+from app.core.token_revocation import token_versions
 from app.models.user import UserPublic, UserRole
 from bson import ObjectId
-from typing import Optional, List
+from bson.errors import InvalidId
+from typing import Any, Optional, List
 
 # OAuth2 password bearer scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+# Caché de usuarios autenticados (id -> UserPublic) para evitar una consulta
+# a Mongo en cada petición
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+def invalidate_principal(user_id: Any):
+    """
+    Drop a cached user. Must be called whenever a user's role, name,
+    email or password changes.
+    """
+    principal_cache.invalidate(str(user_id))
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
     """
     Validate token and return current user
@@ -21,25 +39,49 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
     )
     
     try:
-        # Decode JWT token
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        # Decode JWT token (cached once verified)
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
+    # Modo sin estado: el usuario se construye desde los claims del token
+    if settings.STATELESS_PRINCIPAL and "role" in payload:
+        if token_versions.is_revoked(user_id, payload.get("ver", 0)):
+            raise credentials_exception
+        try:
+            return UserPublic(
+                id=user_id,
+                firstName=payload["firstName"],
+                lastName=payload["lastName"],
+                email=payload["email"],
+                role=payload["role"],
+                createdAt=payload["createdAt"]
+            )
+        except (KeyError, ValueError):
+            raise credentials_exception
+    
+    cached_user = principal_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
     # Get user from database
     db = get_database()
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    try:
+        user = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"firstName": 1, "lastName": 1, "email": 1, "role": 1, "createdAt": 1}
+        )
+    except InvalidId:
+        raise credentials_exception
     
     if user is None:
         raise credentials_exception
     
     # Convert to UserPublic model
-    return UserPublic(
+    current_user = UserPublic(
         id=str(user["_id"]),
         firstName=user["firstName"],
         lastName=user["lastName"],
@@ -47,6 +89,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
         role=user.get("role", UserRole.CLIENT),  # Default to CLIENT if role not set
         createdAt=user["createdAt"]
     )
+    principal_cache.set(user_id, current_user)
+    return current_user
 
 def check_roles(allowed_roles: List[str]):
     """
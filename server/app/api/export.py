@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+from app.api.hydration import fetch_users
+
+# Tamaño de los lotes leídos del cursor e hidratados de una vez
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, list):
+        return [_export_value(item) for item in value]
+    return value
+
+async def export_rows(
+    db,
+    cursor,
+    to_row: Callable[[dict, Dict[ObjectId, dict]], dict],
+    user_ids: Optional[Callable[[dict], Iterable[Any]]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[dict]:
+    """
+    Read documents from a Mongo cursor in batches and yield export rows.
+    Users referenced by each batch (see `user_ids`) are fetched with one
+    query per batch, so memory stays bounded regardless of row count.
+    """
+    async def flush(batch: List[dict]):
+        users = {}
+        if user_ids is not None:
+            users = await fetch_users(db, [uid for document in batch for uid in user_ids(document)])
+        return [to_row(document, users) for document in batch]
+
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            for row in await flush(batch):
+                yield row
+            batch = []
+    if batch:
+        for row in await flush(batch):
+            yield row
+
+async def _csv_lines(rows: AsyncIterator[dict], columns: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for row in rows:
+        values = []
+        for column in columns:
+            value = _export_value(row.get(column))
+            values.append(";".join(map(str, value)) if isinstance(value, list) else value)
+        writer.writerow(values)
+        # Vaciar el buffer en cada fila para no acumular el archivo en memoria
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def _ndjson_lines(rows: AsyncIterator[dict], columns: List[str]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield json.dumps(
+            {column: _export_value(row.get(column)) for column in columns},
+            ensure_ascii=False
+        ) + "\n"
+
+def export_response(
+    rows: AsyncIterator[dict],
+    columns: List[str],
+    export_format: str,
+    filename: str
+) -> StreamingResponse:
+    """Stream export rows as CSV or NDJSON."""
+    lines = _csv_lines(rows, columns) if export_format == "csv" else _ndjson_lines(rows, columns)
+    return StreamingResponse(
+        lines,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
@@ -0,0 +1,51 @@
+from typing import Any, Dict, Iterable, Optional
+from bson import ObjectId
+
+from app.models.user import UserRole
+
+# Solo los campos públicos necesarios para hidratar respuestas
+PUBLIC_USER_PROJECTION = {"firstName": 1, "lastName": 1, "email": 1, "role": 1}
+
+async def fetch_users(db, user_ids: Iterable[Any]) -> Dict[ObjectId, dict]:
+    """
+    Fetch every referenced user with a single `$in` query and return
+    them indexed by _id.
+    """
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if not ids:
+        return {}
+
+    cursor = db.users.find({"_id": {"$in": list(ids)}}, PUBLIC_USER_PROJECTION)
+    return {user["_id"]: user async for user in cursor}
+
+def request_user_ids(request: dict) -> list:
+    """
+    Collect every user id referenced by a request document: client,
+    assigned admin, comment authors, status changes and file uploaders.
+    """
+    ids = [request.get("clientId"), request.get("assignedTo")]
+    ids.extend(comment.get("userId") for comment in request.get("comments", []))
+    ids.extend(change.get("changedBy") for change in request.get("statusHistory", []))
+    ids.extend(file.get("userId") for file in request.get("files", []))
+    return ids
+
+def user_summary(
+    user: Optional[dict],
+    default_role: str = UserRole.CLIENT,
+    include_email: bool = True
+) -> Optional[dict]:
+    """
+    Build the public user payload embedded in request responses.
+    """
+    if not user:
+        return None
+
+    summary = {
+        "id": str(user["_id"]),
+        "firstName": user["firstName"],
+        "lastName": user["lastName"],
+    }
+    if include_email:
+        summary["email"] = user["email"]
+    summary["role"] = user.get("role", default_role)
+    return summary
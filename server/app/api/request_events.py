@@ -0,0 +1,238 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.models.user import UserPublic, UserRole
+from app.models.request import RequestStatus
+
+# Campos de la solicitud que se envían en los eventos; el resto
+# (comentarios embebidos, historial, archivos) se consulta aparte
+EVENT_FIELDS = [
+    "title", "description", "status", "clientId", "assignedTo", "amount",
+    "dueDate", "tags", "commentsCount", "version", "createdAt", "updatedAt"
+]
+
+def change_stream_pipeline() -> list:
+    """
+    Change stream pipeline for the requests collection. It is shared by
+    every subscriber, so it is not filtered by role: RequestEventHub
+    filters each delta by clientId before handing it to a connection.
+    """
+    match = {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}
+    projection = {
+        "operationType": 1,
+        "documentKey": 1,
+        "updateDescription.updatedFields": 1,
+    }
+    projection.update({f"fullDocument.{field}": 1 for field in EVENT_FIELDS})
+    return [{"$match": match}, {"$project": projection}]
+
+def _event_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+def request_delta(change: dict) -> Optional[dict]:
+    """
+    Build a compact delta from a change event: the changed public fields
+    only. Returns None when nothing relevant changed (e.g. only the
+    status history grew).
+    """
+    operation = change["operationType"]
+    delta = {"type": operation, "id": str(change["documentKey"]["_id"])}
+
+    if operation == "delete":
+        return delta
+
+    if operation == "update":
+        source = change.get("updateDescription", {}).get("updatedFields", {})
+    else:
+        source = change.get("fullDocument") or {}
+
+    fields = {field: _event_value(source[field]) for field in EVENT_FIELDS if field in source}
+    if not fields:
+        return None
+    if "status" in fields:
+        fields["statusLabel"] = RequestStatus.status_labels().get(fields["status"], fields["status"])
+    delta["fields"] = fields
+    return delta
+
+def sse_message(data: dict, event: str = "request", event_id: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """
+    One SSE connection: its queue of (event id, delta) pairs and, for
+    clients, the clientId it may see. `missed` is True when the requested
+    resume point is no longer in the hub's buffer.
+    """
+
+    def __init__(self, client_id: Optional[ObjectId], queue_size: int):
+        self.client_id = client_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.missed = False
+
+    def can_see(self, client_id: Optional[ObjectId]) -> bool:
+        # Los borrados no traen fullDocument (client_id None): solo administradores
+        return self.client_id is None or self.client_id == client_id
+
+
+class RequestEventHub:
+    """
+    Un único change stream por proceso sobre `requests`, repartido a las
+    conexiones SSE.
+
+    Una tarea de fondo lee el change stream y deja cada delta en la cola de
+    cada suscriptor que puede verlo; las conexiones solo esperan en su cola,
+    sin ocupar sockets del pool ni hilos de Motor. Los últimos `buffer_size`
+    eventos se conservan para reanudar conexiones con Last-Event-ID. Un
+    suscriptor cuya cola se llena se desconecta con un evento `reset`.
+    """
+
+    def __init__(self, buffer_size: int = 1000, queue_size: int = 256,
+                 retry_seconds: float = 5.0, max_retry_seconds: float = 60.0):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        self._resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events = 0
+        self.dropped = 0
+        self.errors = 0
+        self.connected = False
+
+    def start(self):
+        """Start the change stream task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the change stream task and end every open connection."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+
+    def subscribe(self, current_user: UserPublic, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Register a connection. Buffered events after `last_event_id` are
+        queued right away so a reconnecting client does not lose them.
+        """
+        client_id = ObjectId(current_user.id) if current_user.role == UserRole.CLIENT else None
+        subscription = Subscription(client_id, self.queue_size)
+
+        if last_event_id:
+            ids = [event_id for event_id, _, _ in self._buffer]
+            if last_event_id in ids:
+                pending = [
+                    (event_id, delta)
+                    for event_id, owner, delta in list(self._buffer)[ids.index(last_event_id) + 1:]
+                    if subscription.can_see(owner)
+                ]
+                if len(pending) < self.queue_size:
+                    for item in pending:
+                        subscription.queue.put_nowait(item)
+                else:
+                    subscription.missed = True
+            else:
+                subscription.missed = True
+
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def _close(self, subscription: Subscription):
+        """Drop a subscriber; None tells its connection to end with `reset`."""
+        self._subscribers.discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def publish(self, event_id: str, client_id: Optional[ObjectId], delta: dict):
+        """Buffer a delta and queue it for every subscriber allowed to see it."""
+        self.events += 1
+        self._buffer.append((event_id, client_id, delta))
+        for subscription in list(self._subscribers):
+            if not subscription.can_see(client_id):
+                continue
+            try:
+                subscription.queue.put_nowait((event_id, delta))
+            except asyncio.QueueFull:
+                # Conexión demasiado lenta: que se reconecte y recargue
+                self.dropped += 1
+                self._close(subscription)
+
+    async def _run(self):
+        delay = self.retry_seconds
+        while True:
+            try:
+                db = get_database()
+                options = {"full_document": "updateLookup"}
+                if self._resume_token:
+                    options["resume_after"] = self._resume_token
+                async with db.requests.watch(change_stream_pipeline(), **options) as change_stream:
+                    self.connected = True
+                    delay = self.retry_seconds
+                    async for change in change_stream:
+                        self._resume_token = change["_id"]
+                        delta = request_delta(change)
+                        if delta:
+                            client_id = (change.get("fullDocument") or {}).get("clientId")
+                            self.publish(change["_id"]["_data"], client_id, delta)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                # p. ej. MongoDB sin replica set, o token de reanudación vencido
+                self.errors += 1
+                print(f"Error en el change stream de solicitudes (reintento en {delay:.0f}s): {e}")
+            except Exception as e:
+                # Error procesando un evento (decodificación, reparto...): el
+                # token ya apunta a ese evento, así que se reanuda después de
+                # él; los suscriptores lo perdieron y deben recargar
+                self.errors += 1
+                print(f"Error procesando el change stream de solicitudes (reintento en {delay:.0f}s): {e}")
+                for subscription in list(self._subscribers):
+                    self._close(subscription)
+            finally:
+                self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "connected": self.connected,
+            "subscribers": len(self._subscribers),
+            "events": self.events,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+request_events = RequestEventHub(
+    buffer_size=settings.REQUEST_STREAM_BUFFER_SIZE,
+    queue_size=settings.REQUEST_STREAM_QUEUE_SIZE,
+)
@@ -0,0 +1,42 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    # orjson serializa datetime de forma nativa; solo faltan los tipos de BSON
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError
+
+
+def _str_keys(value: Any) -> Any:
+    # Claves que OPT_NON_STR_KEYS no admite (p. ej. ObjectId de un $group)
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, (str, int, float, bool)) or key is None else str(key): _str_keys(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_str_keys(item) for item in value]
+    return value
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, with native ObjectId and datetime
+    support.
+
+    It is the application's default response class. Routes on hot paths
+    return it directly with the Mongo documents, which skips FastAPI's
+    response_model validation and jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        # OPT_NON_STR_KEYS: claves None/numéricas (conteos de un $group) como en json
+        try:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return orjson.dumps(_str_keys(content), default=_default, option=orjson.OPT_NON_STR_KEYS)
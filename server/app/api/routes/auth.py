@@ -1,11 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Any
-import smtplib
-import ssl
-import socket
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import Header
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
@@ -18,15 +12,16 @@ from app.models.user import (
     UserRole,
 )
 from app.core.security import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
+    verify_password_async,
+    get_password_hash_async,
+    create_user_access_token,
     create_reset_token,
     create_email_verification_token,
 )
 from app.core.database import get_database
-from app.api.deps import get_current_user
-from app.core.email_service import send_email
+from app.api.deps import get_current_user, invalidate_principal
+from app.core.email_queue import enqueue_email
+from app.core.token_revocation import token_versions
 from app.templates.email_verification import get_email_verification_template
 from app.templates.password_reset import get_password_reset_template
 from app.core.config import settings
@@ -57,7 +52,7 @@ async def register_user(user_in: UserCreate = Body(...)) -> Any:
         "firstName": user_in.firstName,
         "lastName": user_in.lastName,
         "email": user_in.email,
-        "password": get_password_hash(user_in.password),
+        "password": await get_password_hash_async(user_in.password),
         "role": UserRole.CLIENT,  # Por defecto, todos los usuarios nuevos son clientes
         "emailVerified": False,
         "emailVerificationToken": verification_token,
@@ -76,17 +71,13 @@ async def register_user(user_in: UserCreate = Body(...)) -> Any:
         user_name, verification_url
     )
 
-    # Enviar e-mail de verificación
-    try:
-        send_email(
-            to_email=user_in.email,
-            subject="Verifica tu correo electrónico - EncoderGroup",
-            text_content=text_content,
-            html_content=html_content,
-        )
-    except Exception as e:
-        # No detengas el registro por fallo de e-mail; deja info en logs
-        print(f"Error enviando e-mail de verificación: {e}")
+    # Encolar e-mail de verificación (no detiene el registro si falla)
+    await enqueue_email(
+        to_email=user_in.email,
+        subject="Verifica tu correo electrónico - EncoderGroup",
+        text_content=text_content,
+        html_content=html_content,
+    )
 
     # Hasta verificar, el frontend debe saber que falta verificación
     return {
@@ -110,7 +101,7 @@ async def login(login_data: UserLogin = Body(...)) -> Any:
     """
     db = get_database()
     user = await db.users.find_one({"email": login_data.email})
-    if not user or not verify_password(login_data.password, user["password"]):
+    if not user or not await verify_password_async(login_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -147,7 +138,7 @@ async def login(login_data: UserLogin = Body(...)) -> Any:
             "firstName": user["firstName"],
             "lastName": user["lastName"],
             "email": user["email"],
-            "token": create_access_token(user["_id"]),
+            "token": create_user_access_token(user),
         },
     }
 
@@ -178,36 +169,12 @@ async def forgot_password(email_data: ForgotPassword = Body(...)) -> Any:
     user_name = f"{user['firstName']} {user['lastName']}"
     html_content, text_content = get_password_reset_template(user_name, reset_url)
 
-    # --- fallback opcional en texto plano ---
-    # text_content = (
-    #     f"Has solicitado restablecer tu contraseña.\n\n"
-    #     f"Visita: {reset_url}\n\n"
-    #     f"Este enlace expira en 30 min.\n"
-    # )
-    # ----------------------------------------
-
-    try:
-        # smtp_ip resuelve problemas de DNS dentro de Docker
-        smtp_ip = socket.gethostbyname(settings.SMTP_HOST)
-        smtp_server = smtp_ip or settings.SMTP_HOST
-
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = Header("Recuperación de contraseña - MisViaticos", "utf-8")
-        msg["From"] = settings.SMTP_USER
-        msg["To"] = email_data.email
-        msg.attach(MIMEText(text_content, "plain", "utf-8"))
-        msg.attach(MIMEText(html_content, "html", "utf-8"))
-
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-
-        with smtplib.SMTP_SSL(smtp_server, settings.SMTP_PORT, context=context) as server:
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.sendmail(settings.SMTP_USER, email_data.email, msg.as_string())
-
-    except Exception as e:
-        print(f"Error al enviar e-mail de recuperación: {e}")
+    await enqueue_email(
+        to_email=email_data.email,
+        subject="Recuperación de contraseña - MisViaticos",
+        text_content=text_content,
+        html_content=html_content,
+    )
 
     return {"success": True, "message": "Email sent with password reset instructions"}
 
@@ -232,15 +199,18 @@ async def reset_password(reset_token: str, data: ResetPassword = Body(...)) -> A
     await db.users.update_one(
         {"_id": user["_id"]},
         {
-            "$set": {"password": get_password_hash(data.password)},
+            "$set": {"password": await get_password_hash_async(data.password)},
             "$unset": {"resetPasswordToken": "", "resetPasswordExpire": ""},
         },
     )
+    invalidate_principal(user["_id"])
+    # Revocar los tokens emitidos antes del cambio de contraseña
+    user["tokenVersion"] = await token_versions.bump(user["_id"])
 
     return {
         "success": True,
         "message": "Password updated successfully",
-        "token": create_access_token(user["_id"]),
+        "token": create_user_access_token(user),
     }
 
 
@@ -276,7 +246,7 @@ async def verify_email(verification_token: str) -> Any:
     return {
         "success": True,
         "message": "Email successfully verified",
-        "accessToken": create_access_token(user["_id"]),
+        "accessToken": create_user_access_token(user),
         "user": {
             "id": str(user["_id"]),
             "firstName": user["firstName"],
@@ -313,15 +283,12 @@ async def resend_verification(email_data: ForgotPassword = Body(...)) -> Any:
         f"{user['firstName']} {user['lastName']}", verification_url
     )
 
-    try:
-        send_email(
-            to_email=user["email"],
-            subject="Verifica tu correo electrónico - EncoderGroup",
-            text_content=text_content,
-            html_content=html_content,
-        )
-    except Exception as e:
-        print(f"Error re-enviando verificación: {e}")
+    await enqueue_email(
+        to_email=user["email"],
+        subject="Verifica tu correo electrónico - EncoderGroup",
+        text_content=text_content,
+        html_content=html_content,
+    )
 
     return {"success": True, "message": "Verification e-mail sent if account exists"}
 
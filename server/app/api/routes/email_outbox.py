@@ -0,0 +1,45 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from bson import ObjectId
+
+from app.models.user import UserPublic
+from app.models.email_outbox import OutboxRequeueRequest
+from app.api.deps import get_admin_user
+from app.core.email_queue import email_outbox
+
+router = APIRouter()
+
+@router.get("/stats", response_model=dict)
+async def get_outbox_stats(current_user: UserPublic = Depends(get_admin_user)) -> Any:
+    """
+    Estado de la cola de correos salientes (solo administradores).
+    """
+    return {
+        "success": True,
+        "data": await email_outbox.stats()
+    }
+
+@router.post("/requeue", response_model=dict)
+async def requeue_dead_emails(
+    requeue: OutboxRequeueRequest = Body(OutboxRequeueRequest()),
+    current_user: UserPublic = Depends(get_admin_user)
+) -> Any:
+    """
+    Reencolar correos que superaron el máximo de intentos (solo administradores).
+    """
+    ids = None
+    if requeue.ids:
+        if not all(ObjectId.is_valid(i) for i in requeue.ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ID de correo inválido"
+            )
+        ids = [ObjectId(i) for i in requeue.ids]
+    
+    requeued = await email_outbox.requeue(ids)
+    
+    return {
+        "success": True,
+        "message": f"{requeued} correos reencolados",
+        "requeued": requeued
+    }
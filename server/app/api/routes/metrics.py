@@ -0,0 +1,35 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+
+from app.models.user import UserPublic
+from app.api.deps import get_admin_user, principal_cache
+from app.core.password_hashing import password_hasher
+from app.core.token_revocation import token_versions
+from app.core.security import verified_token_cache
+from app.core.email_queue import email_outbox
+from app.core.email_service import smtp_pool
+from app.core.due_reminders import due_date_reminders
+from app.api.request_events import request_events
+from app.core import database
+
+router = APIRouter()
+
+@router.get("/", response_model=dict)
+async def get_metrics(current_user: UserPublic = Depends(get_admin_user)) -> Any:
+    """
+    Métricas internas de la API (solo administradores).
+    """
+    return {
+        "success": True,
+        "data": {
+            "passwordHashing": password_hasher.stats(),
+            "principalCache": principal_cache.stats(),
+            "tokenVersions": token_versions.stats(),
+            "verifiedTokenCache": verified_token_cache.stats(),
+            "emailOutbox": await email_outbox.stats(),
+            "smtpPool": smtp_pool.stats(),
+            "dueDateReminders": due_date_reminders.stats(),
+            "requestEvents": request_events.stats(),
+            "indexes": database.index_report
+        }
+    }
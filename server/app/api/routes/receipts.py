@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Form, Query, Header
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Any
 from app.models.receipt import ReceiptCreate, ReceiptUpdate, ReceiptStatusUpdate, ReceiptResponse, ReceiptStats
 from app.models.user import UserPublic
 from app.api.deps import get_current_user
+from app.api.export import EXPORT_BATCH_SIZE, export_response, export_rows
+from app.api.responses import MongoJSONResponse
+from app.api.versioning import etag, parse_if_match, version_conflict, version_filter
 from app.core.database import get_database
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from datetime import datetime
 import os
 import shutil
@@ -12,6 +18,12 @@ import uuid
 
 router = APIRouter()
 
+# Columnas de la exportación de boletas
+RECEIPT_EXPORT_COLUMNS = [
+    "id", "companyName", "folioNumber", "date", "description", "totalAmount",
+    "status", "imageUrl", "createdAt", "updatedAt"
+]
+
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def create_receipt(
     companyName: str = Form(...),
@@ -55,6 +67,7 @@ async def create_receipt(
         "totalAmount": totalAmount,
         "imageUrl": image_url,
         "status": "en_revision",
+        "version": 1,
         "createdAt": datetime.utcnow(),
         "updatedAt": datetime.utcnow()
     }
@@ -70,10 +83,10 @@ async def create_receipt(
     created_receipt["id"] = str(created_receipt["_id"])
     created_receipt["user"] = str(created_receipt["user"])
     
-    return {
+    return MongoJSONResponse({
         "success": True,
         "data": created_receipt
-    }
+    }, status_code=status.HTTP_201_CREATED, headers={"ETag": etag(created_receipt["version"])})
 
 @router.get("/", response_model=dict)
 async def get_receipts(current_user: UserPublic = Depends(get_current_user)) -> Any:
@@ -86,18 +99,15 @@ async def get_receipts(current_user: UserPublic = Depends(get_current_user)) ->
     cursor = db.receipts.find({"user": ObjectId(current_user.id)})
     receipts = await cursor.to_list(length=100)  # Limit to 100 receipts
     
-    # Format response
-    formatted_receipts = []
+    # Format response (ObjectId/datetime are serialized by MongoJSONResponse)
     for receipt in receipts:
-        receipt["id"] = str(receipt["_id"])
-        receipt["user"] = str(receipt["user"])
-        formatted_receipts.append(receipt)
+        receipt["id"] = receipt["_id"]
     
-    return {
+    return MongoJSONResponse({
         "success": True,
-        "count": len(formatted_receipts),
-        "data": formatted_receipts
-    }
+        "count": len(receipts),
+        "data": receipts
+    })
 
 @router.get("/stats", response_model=dict)
 async def get_receipt_stats(current_user: UserPublic = Depends(get_current_user)) -> Any:
@@ -145,6 +155,26 @@ async def get_receipt_stats(current_user: UserPublic = Depends(get_current_user)
         }
     }
 
+@router.get("/export")
+async def export_receipts(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Formato: csv o ndjson"),
+    current_user: UserPublic = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Export all receipts for current user as CSV or NDJSON, streamed from
+    the Mongo cursor with constant memory
+    """
+    db = get_database()
+    
+    documents = db.receipts.find({"user": ObjectId(current_user.id)}) \
+        .sort("createdAt", -1).batch_size(EXPORT_BATCH_SIZE)
+    
+    def to_row(receipt: dict, users: dict) -> dict:
+        return {**receipt, "id": receipt["_id"]}
+    
+    rows = export_rows(db, documents, to_row)
+    return export_response(rows, RECEIPT_EXPORT_COLUMNS, format, "boletas")
+
 @router.get("/{receipt_id}", response_model=dict)
 async def get_receipt_by_id(
     receipt_id: str,
@@ -171,10 +201,59 @@ async def get_receipt_by_id(
     receipt["id"] = str(receipt["_id"])
     receipt["user"] = str(receipt["user"])
     
-    return {
+    return MongoJSONResponse({
         "success": True,
         "data": receipt
-    }
+    }, headers={"ETag": etag(receipt.get("version", 0))})
+
+async def _update_receipt(db, receipt_id: str, user_id: str, update_data: dict, expected_version: Optional[int]):
+    """
+    Apply `update_data` with one conditional find_one_and_update on _id,
+    owner and (when given) version. Returns the previous and the updated
+    receipt, or raises 404 / 409.
+    """
+    try:
+        receipt_oid = ObjectId(receipt_id)
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid receipt ID"
+        )
+    
+    query = {"_id": receipt_oid, "user": ObjectId(user_id)}
+    if expected_version is not None:
+        query.update(version_filter(expected_version))
+    
+    previous = await db.receipts.find_one_and_update(
+        query,
+        {"$set": update_data, "$inc": {"version": 1}},
+        return_document=ReturnDocument.BEFORE
+    )
+    
+    if previous is None:
+        current = await db.receipts.find_one({"_id": receipt_oid, "user": ObjectId(user_id)}, {"version": 1})
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Receipt not found"
+            )
+        raise version_conflict(
+            current.get("version", 0),
+            "Receipt was modified by another request. Reload it and try again"
+        )
+    
+    updated = {**previous, **update_data, "version": previous.get("version", 0) + 1}
+    return previous, updated
+
+def _receipt_response(receipt: dict) -> MongoJSONResponse:
+    # Format response
+    receipt["id"] = str(receipt["_id"])
+    receipt["user"] = str(receipt["user"])
+    
+    return MongoJSONResponse({
+        "success": True,
+        "data": receipt
+    }, headers={"ETag": etag(receipt["version"])})
 
 @router.put("/{receipt_id}", response_model=dict)
 async def update_receipt(
@@ -185,24 +264,21 @@ async def update_receipt(
     description: Optional[str] = Form(None),
     totalAmount: Optional[float] = Form(None),
     image: Optional[UploadFile] = File(None),
+    version: Optional[int] = Form(None, ge=0),
+    if_match: Optional[str] = Header(None, alias="If-Match"),
     current_user: UserPublic = Depends(get_current_user)
 ) -> Any:
     """
-    Update receipt by ID
+    Update receipt by ID.
+    When the version read by the client is given (If-Match header or
+    `version` field) the update only applies if the receipt is still at
+    that version; otherwise it returns 409.
     """
     db = get_database()
     
-    # Find receipt by ID and verify ownership
-    receipt = await db.receipts.find_one({
-        "_id": ObjectId(receipt_id),
-        "user": ObjectId(current_user.id)
-    })
-    
-    if not receipt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt not found"
-        )
+    expected_version = parse_if_match(if_match)
+    if expected_version is None:
+        expected_version = version
     
     # Prepare update data
     update_data = {}
@@ -223,23 +299,18 @@ async def update_receipt(
         update_data["totalAmount"] = totalAmount
     
     # Handle image upload if present
+    new_image_path = None
     if image:
-        # Delete old image if exists
-        if receipt.get("imageUrl"):
-            old_image_path = os.path.join(os.getcwd(), receipt["imageUrl"].lstrip("/"))
-            if os.path.exists(old_image_path):
-                os.remove(old_image_path)
-        
         # Create uploads directory if it doesn't exist
         os.makedirs("uploads", exist_ok=True)
         
         # Generate unique filename for the image
         file_extension = os.path.splitext(image.filename)[1]
         unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join("uploads", unique_filename)
+        new_image_path = os.path.join("uploads", unique_filename)
         
         # Save the file
-        with open(file_path, "wb") as buffer:
+        with open(new_image_path, "wb") as buffer:
             shutil.copyfileobj(image.file, buffer)
         
         # Set image URL for database
@@ -248,68 +319,46 @@ async def update_receipt(
     # Always update the updatedAt field
     update_data["updatedAt"] = datetime.utcnow()
     
-    # Update receipt in database
-    if update_data:
-        await db.receipts.update_one(
-            {"_id": ObjectId(receipt_id)},
-            {"$set": update_data}
+    try:
+        previous, updated_receipt = await _update_receipt(
+            db, receipt_id, current_user.id, update_data, expected_version
         )
-    
-    # Get updated receipt
-    updated_receipt = await db.receipts.find_one({"_id": ObjectId(receipt_id)})
-    
-    # Format response
-    updated_receipt["id"] = str(updated_receipt["_id"])
-    updated_receipt["user"] = str(updated_receipt["user"])
-    
-    return {
-        "success": True,
-        "data": updated_receipt
-    }
+    except HTTPException:
+        # The update was rejected: discard the uploaded image
+        if new_image_path and os.path.exists(new_image_path):
+            os.remove(new_image_path)
+        raise
+    
+    # Delete old image once the new one is stored
+    if image and previous.get("imageUrl"):
+        old_image_path = os.path.join(os.getcwd(), previous["imageUrl"].lstrip("/"))
+        if os.path.exists(old_image_path):
+            os.remove(old_image_path)
+    
+    return _receipt_response(updated_receipt)
 
 @router.patch("/{receipt_id}/status", response_model=dict)
 async def update_receipt_status(
     receipt_id: str,
     status_data: ReceiptStatusUpdate = Body(...),
+    if_match: Optional[str] = Header(None, alias="If-Match"),
     current_user: UserPublic = Depends(get_current_user)
 ) -> Any:
     """
-    Update receipt status
+    Update receipt status (conditional on the If-Match version, if given)
     """
     db = get_database()
     
-    # Find receipt by ID and verify ownership
-    receipt = await db.receipts.find_one({
-        "_id": ObjectId(receipt_id),
-        "user": ObjectId(current_user.id)
-    })
-    
-    if not receipt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Receipt not found"
-        )
-    
     # Update status and updatedAt field
-    await db.receipts.update_one(
-        {"_id": ObjectId(receipt_id)},
-        {"$set": {
-            "status": status_data.status,
-            "updatedAt": datetime.utcnow()
-        }}
+    _, updated_receipt = await _update_receipt(
+        db,
+        receipt_id,
+        current_user.id,
+        {"status": status_data.status, "updatedAt": datetime.utcnow()},
+        parse_if_match(if_match)
     )
     
-    # Get updated receipt
-    updated_receipt = await db.receipts.find_one({"_id": ObjectId(receipt_id)})
-    
-    # Format response
-    updated_receipt["id"] = str(updated_receipt["_id"])
-    updated_receipt["user"] = str(updated_receipt["user"])
-    
-    return {
-        "success": True,
-        "data": updated_receipt
-    }
+    return _receipt_response(updated_receipt)
 
 @router.delete("/{receipt_id}", response_model=dict)
 async def delete_receipt(
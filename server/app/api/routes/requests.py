@@ -1,7 +1,15 @@
+import asyncio
+import base64
+import json
+import uuid
 from typing import Any, List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Path, Header, Response
+from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
 
 from app.models.user import UserPublic, UserRole
 from app.models.request import (
@@ -9,6 +17,7 @@ from app.models.request import (
     RequestCreate, 
     RequestUpdate, 
     StatusChangeRequest,
+    BulkRequestUpdate,
     CommentCreate,
     RequestStatus,
     RequestResponse,
@@ -16,10 +25,236 @@ from app.models.request import (
     RequestComment
 )
 from app.core.database import get_database
+from app.core.config import settings
+from app.core.request_comments import RECENT_COMMENTS, move_embedded_comments
+from app.core.request_sla import sla_report
+from app.core.request_tags import record_tag_change, search_tags
+from app.core.request_stats import (
+    STATS_COLLECTION,
+    GLOBAL_STATS_ID,
+    record_request_change,
+    record_request_changes,
+    stats_id,
+    stats_summary
+)
 from app.api.deps import get_current_user, get_admin_user, get_client_user, get_any_user
+from app.api.hydration import fetch_users, request_user_ids, user_summary
+from app.api.export import EXPORT_BATCH_SIZE, export_response, export_rows
+from app.api.responses import MongoJSONResponse
+from app.api.versioning import etag, parse_if_match, version_conflict, version_filter
+from app.api.request_events import request_events, sse_message
 
 router = APIRouter()
 
+# Orden estable de los listados: (createdAt, _id) descendente
+REQUESTS_SORT = [("createdAt", -1), ("_id", -1)]
+
+# Proyección de los listados: excluye los arreglos embebidos (comentarios,
+# archivos, historial) y calcula sus tamaños en el servidor
+REQUEST_LIST_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "status": 1,
+    "clientId": 1,
+    "assignedTo": 1,
+    "amount": 1,
+    "dueDate": 1,
+    "tags": 1,
+    "version": 1,
+    "createdAt": 1,
+    "updatedAt": 1,
+    # Las solicitudes sin migrar aún no tienen el contador commentsCount
+    "commentsCount": {"$ifNull": ["$commentsCount", {"$size": {"$ifNull": ["$comments", []]}}]},
+    "filesCount": {"$size": {"$ifNull": ["$files", []]}},
+}
+
+# Columnas de la exportación de solicitudes
+REQUEST_EXPORT_COLUMNS = [
+    "id", "title", "description", "status", "statusLabel", "clientId", "clientName",
+    "clientEmail", "assignedTo", "assignedAdminName", "amount", "dueDate", "tags",
+    "commentsCount", "filesCount", "createdAt", "updatedAt"
+]
+
+def _encode_cursor(request: dict) -> str:
+    """Build the opaque keyset cursor pointing after `request`."""
+    raw = json.dumps({"c": request["createdAt"].isoformat(), "i": str(request["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+async def _estimate_total(db, query: dict):
+    """
+    Cheap total for large result sets: collection metadata when there is no
+    filter, otherwise a count capped at REQUESTS_COUNT_ESTIMATE_CAP.
+    Returns (total, is_exact).
+    """
+    if not query:
+        return await db.requests.estimated_document_count(), False
+    total = await db.requests.count_documents(query, limit=settings.REQUESTS_COUNT_ESTIMATE_CAP)
+    return total, total < settings.REQUESTS_COUNT_ESTIMATE_CAP
+
+def _keyset_filter(cursor: str) -> dict:
+    """Translate an opaque cursor into a filter for the rows after it."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(raw["c"])
+        last_id = ObjectId(raw["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return {"$or": [
+        {"createdAt": {"$lt": created_at}},
+        {"createdAt": created_at, "_id": {"$lt": last_id}}
+    ]}
+
+def build_requests_query(
+    current_user: UserPublic,
+    status_filter: Optional[str] = None,
+    client_id: Optional[str] = None,
+    search: Optional[str] = None,
+    search_mode: str = "regex",
+    tags: Optional[List[str]] = None,
+    tags_mode: str = "any"
+) -> dict:
+    """
+    Build the Mongo filter shared by the request list and export endpoints.
+    Clients are always restricted to their own requests.
+    """
+    # Construir la consulta según los filtros
+    query = {}
+    
+    # Filtrar por estado si se proporciona
+    if status_filter and status_filter in RequestStatus.all_statuses():
+        query["status"] = status_filter
+    
+    # Filtrar por cliente
+    if current_user.role == UserRole.CLIENT:
+        # Los clientes solo pueden ver sus propias solicitudes
+        query["clientId"] = ObjectId(current_user.id)
+    elif current_user.role == UserRole.ADMIN and client_id:
+        # Los administradores pueden filtrar por cliente
+        query["clientId"] = ObjectId(client_id)
+    
+    # Buscar en título o descripción
+    if search and search_mode == "text":
+        # Usa el índice de texto (con stemming en español) y ordena por relevancia
+        query["$text"] = {"$search": search, "$language": "spanish"}
+    elif search:
+        query["$or"] = [
+            {"title": {"$regex": search, "$options": "i"}},
+            {"description": {"$regex": search, "$options": "i"}}
+        ]
+    
+    # Filtrar por etiquetas (índice multikey sobre tags)
+    tags = [tag for tag in (tags or []) if tag]
+    if tags:
+        query["tags"] = {"$all" if tags_mode == "all" else "$in": tags}
+    
+    return query
+
+def status_transition_update(
+    to_status: str,
+    changed_by: ObjectId,
+    reason: Optional[str],
+    extra_fields: Optional[dict] = None
+) -> list:
+    """
+    Update pipeline that moves a request to `to_status` and appends the
+    statusHistory entry, reading the previous status from the document
+    itself so the whole transition is a single write.
+    """
+    now = datetime.utcnow()
+    return [{"$set": {
+        **{field: {"$literal": value} for field, value in (extra_fields or {}).items()},
+        "status": to_status,
+        "updatedAt": now,
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        "statusHistory": {"$concatArrays": [
+            {"$ifNull": ["$statusHistory", []]},
+            [{
+                "fromStatus": "$status",
+                "toStatus": to_status,
+                "changedBy": changed_by,
+                "changedAt": now,
+                "reason": {"$literal": reason}
+            }]
+        ]}
+    }}]
+
+async def apply_status_transition(
+    db,
+    request_id: str,
+    to_status: str,
+    current_user: UserPublic,
+    reason: Optional[str],
+    transitions: dict,
+    expected_version: Optional[int] = None
+) -> dict:
+    """
+    Atomically change a request's status with one find_one_and_update that
+    only matches when the current status may move to `to_status` according
+    to `transitions` (and, for clients, when they own the request, and when
+    `expected_version` is given, when the request is still at that version).
+    Returns the updated document or raises the matching HTTP error.
+    """
+    try:
+        request_oid = ObjectId(request_id)
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID de solicitud inválido"
+        )
+    
+    if to_status not in RequestStatus.all_statuses():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Estado no válido"
+        )
+    
+    query = {"_id": request_oid, "status": {"$in": RequestStatus.allowed_from(to_status, transitions)}}
+    if current_user.role == UserRole.CLIENT:
+        query["clientId"] = ObjectId(current_user.id)
+    if expected_version is not None:
+        query.update(version_filter(expected_version))
+    
+    updated = await db.requests.find_one_and_update(
+        query,
+        status_transition_update(to_status, ObjectId(current_user.id), reason),
+        projection={"comments": 0, "files": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is not None:
+        previous = {**updated, "status": updated["statusHistory"][-1]["fromStatus"]}
+        await record_request_change(db, previous, updated)
+        return updated
+    
+    # Camino de error: averiguar por qué no hubo coincidencia
+    request = await db.requests.find_one({"_id": request_oid}, {"clientId": 1, "status": 1, "version": 1})
+    if not request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Solicitud no encontrada"
+        )
+    if current_user.role == UserRole.CLIENT and str(request["clientId"]) != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para modificar esta solicitud"
+        )
+    if expected_version is not None and request.get("version", 0) != expected_version:
+        raise version_conflict(
+            request.get("version", 0),
+            "La solicitud fue modificada por otro usuario. Vuelve a cargarla e inténtalo de nuevo"
+        )
+    if request["status"] == to_status:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La solicitud ya está en estado {to_status}"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"No se puede cambiar una solicitud de {request['status']} a {to_status}"
+    )
+
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def create_request(
     request_in: RequestCreate,
@@ -36,7 +271,9 @@ async def create_request(
         "clientId": ObjectId(current_user.id),
         "status": RequestStatus.DRAFT,
         "comments": [],
+        "commentsCount": 0,
         "files": [],
+        "version": 1,
         "statusHistory": [{
             "fromStatus": None,
             "toStatus": RequestStatus.DRAFT,
@@ -49,6 +286,8 @@ async def create_request(
     })
     
     result = await db.requests.insert_one(request_data)
+    await record_request_change(db, None, request_data)
+    await record_tag_change(db, None, request_data["tags"])
     created_request = await db.requests.find_one({"_id": result.inserted_id})
     
     if created_request is None:
@@ -68,104 +307,460 @@ async def get_requests(
     status: Optional[str] = Query(None, description="Filtrar por estado"),
     client_id: Optional[str] = Query(None, description="Filtrar por cliente (solo para administradores)"),
     search: Optional[str] = Query(None, description="Buscar en título o descripción"),
+    search_mode: str = Query("regex", pattern="^(regex|text)$", description="Búsqueda: regex (subcadena, por defecto) o text (índice de texto, por relevancia; sin paginación por cursor)"),
+    tags: Optional[List[str]] = Query(None, description="Filtrar por etiquetas (repetir el parámetro para varias)"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="Etiquetas: any (alguna) o all (todas)"),
     skip: int = Query(0, ge=0, description="Número de elementos a omitir"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de elementos a devolver"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de paginación (nextCursor de la página anterior)"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="Cálculo del total: exact, estimate o none"),
     current_user: UserPublic = Depends(get_any_user)
 ) -> dict:
     """
     Obtener lista de solicitudes según los filtros.
     Los administradores pueden ver todas las solicitudes.
     Los clientes solo pueden ver sus propias solicitudes.
+    
+    Admite paginación por cursor (`cursor` / `nextCursor`), cuyo costo no
+    depende de la profundidad de la página, y por `skip` por compatibilidad.
+    
+    Con `count=exact` el total y el conteo por estado salen de un único
+    $group, ejecutado en paralelo con la consulta de la página; `estimate`
+    y `none` evitan contar todo el resultado en colecciones muy grandes.
     """
     db = get_database()
     
-    # Construir la consulta según los filtros
-    query = {}
+    query = build_requests_query(current_user, status, client_id, search, search_mode, tags, tags_mode)
+    text_search = "$text" in query
+    if text_search and cursor:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="La búsqueda de texto usa paginación por skip"
+        )
     
-    # Filtrar por estado si se proporciona
-    if status and status in RequestStatus.all_statuses():
-        query["status"] = status
+    # Etapas de la página: por cursor (keyset) o por skip
+    keyset_stages = []
+    if cursor:
+        keyset_stages.append({"$match": _keyset_filter(cursor)})
+        skip = 0
+    sort = dict(REQUESTS_SORT)
+    if text_search:
+        sort = {"score": {"$meta": "textScore"}, **sort}
+    page_stages = [{"$sort": sort}]
+    if skip:
+        page_stages.append({"$skip": skip})
+    page_stages.append({"$limit": limit})
+    page_stages.append({"$project": REQUEST_LIST_PROJECTION})
     
-    # Filtrar por cliente
-    if current_user.role == UserRole.CLIENT:
-        # Los clientes solo pueden ver sus propias solicitudes
-        query["clientId"] = ObjectId(current_user.id)
-    elif current_user.role == UserRole.ADMIN and client_id:
-        # Los administradores pueden filtrar por cliente
-        query["clientId"] = ObjectId(client_id)
+    # La página va fuera de $facet para que $sort/$limit usen el índice
+    # (createdAt, _id) y solo se lean `limit` documentos
+    page_query = db.requests.aggregate(
+        [{"$match": query}] + keyset_stages + page_stages
+    ).to_list(length=limit)
     
-    # Buscar en título o descripción
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+    total = None
+    total_is_exact = False
+    status_counts = None
+    if count == "exact":
+        # Total y conteo por estado con un solo $group sobre status, en paralelo con la página
+        page, by_status = await asyncio.gather(
+            page_query,
+            db.requests.aggregate([
+                {"$match": query},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+        )
+        status_counts = {row["_id"]: row["count"] for row in by_status}
+        total = sum(status_counts.values())
+        total_is_exact = True
+    else:
+        page = await page_query
+        if count == "estimate":
+            total, total_is_exact = await _estimate_total(db, query)
+    
+    # Hidratar clientes y administradores asignados con una sola consulta
+    users = await fetch_users(
+        db,
+        [request["clientId"] for request in page] + [request.get("assignedTo") for request in page]
+    )
+    
+    next_cursor = _encode_cursor(page[-1]) if len(page) == limit and not text_search else None
+    
+    # Completar los documentos de la página en el lugar; MongoJSONResponse
+    # serializa ObjectId y datetime sin copias intermedias
+    status_labels = RequestStatus.status_labels()
+    for request in page:
+        request["id"] = request.pop("_id")
+        request["statusLabel"] = status_labels.get(request["status"], request["status"])
+        request["client"] = user_summary(users.get(request["clientId"]), UserRole.CLIENT)
+        request.setdefault("assignedTo", None)
+        request["assignedAdmin"] = (
+            user_summary(users.get(request["assignedTo"]), UserRole.ADMIN) if request["assignedTo"] else None
+        )
+        request.setdefault("amount", None)
+        request.setdefault("dueDate", None)
+        request.setdefault("tags", [])
+        request.setdefault("version", 0)
+        request.setdefault("updatedAt", None)
+    
+    return MongoJSONResponse({
+        "success": True,
+        "total": total,
+        "totalIsExact": total_is_exact,
+        "statusCounts": status_counts,
+        "skip": skip,
+        "limit": limit,
+        "nextCursor": next_cursor,
+        "requests": page
+    })
+
+@router.post("/bulk", response_model=dict)
+async def bulk_update_requests(
+    bulk_update: BulkRequestUpdate = Body(...),
+    current_user: UserPublic = Depends(get_admin_user)
+) -> dict:
+    """
+    Cambiar el estado y/o el administrador asignado de varias solicitudes
+    en una sola operación (solo administradores).
+    Devuelve el resultado de cada ID.
+    """
+    db = get_database()
+    
+    if not bulk_update.status and not bulk_update.assignedTo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debes indicar un estado o un administrador asignado"
+        )
+    
+    allowed_from = None
+    if bulk_update.status:
+        if bulk_update.status not in RequestStatus.all_statuses():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Estado no válido"
+            )
+        allowed_from = RequestStatus.allowed_from(bulk_update.status)
+    
+    extra_fields = {}
+    if bulk_update.assignedTo:
+        if not ObjectId.is_valid(bulk_update.assignedTo) or not await db.users.find_one(
+            {"_id": ObjectId(bulk_update.assignedTo), "role": UserRole.ADMIN}, {"_id": 1}
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El usuario asignado debe ser un administrador válido"
+            )
+        extra_fields["assignedTo"] = ObjectId(bulk_update.assignedTo)
+    
+    # Validar IDs y transiciones con una sola lectura. Los IDs se normalizan
+    # a ObjectId: variantes en mayúsculas del mismo ID son la misma solicitud
+    results = {}
+    input_oids = {}
+    for request_id in dict.fromkeys(bulk_update.ids):
+        if ObjectId.is_valid(request_id):
+            input_oids[request_id] = ObjectId(request_id)
+        else:
+            results[request_id] = {"id": request_id, "success": False, "error": "ID de solicitud inválido"}
+    valid_ids = list(dict.fromkeys(input_oids.values()))
+    
+    current_requests = {
+        request["_id"]: request
+        async for request in db.requests.find(
+            {"_id": {"$in": valid_ids}}, {"status": 1, "clientId": 1, "assignedTo": 1, "amount": 1, "version": 1}
+        )
+    }
+    current = {request_oid: request["status"] for request_oid, request in current_requests.items()}
     
-    # Obtener el total de elementos que coinciden con la consulta
-    total = await db.requests.count_documents(query)
-    
-    # Obtener las solicitudes paginadas
-    cursor = db.requests.find(query).sort("createdAt", -1).skip(skip).limit(limit)
-    requests_list = []
-    
-    async for request in cursor:
-        # Obtener información del cliente
-        client = await db.users.find_one({"_id": request["clientId"]})
-        client_data = None
-        if client:
-            client_data = {
-                "id": str(client["_id"]),
-                "firstName": client["firstName"],
-                "lastName": client["lastName"],
-                "email": client["email"],
-                "role": client.get("role", UserRole.CLIENT)
-            }
+    # Cada escritura exige la versión leída: si coincide, la lectura anterior
+    # sigue vigente (para la transición y para las estadísticas). La marca
+    # temporal bulkUpdateId permite saber después exactamente qué escrituras
+    # se aplicaron; se elimina al terminar.
+    bulk_update_id = uuid.uuid4().hex
+    operations = []
+    pending_ids = []
+    for request_oid in valid_ids:
+        request_id = str(request_oid)
+        if request_oid not in current:
+            results[request_id] = {"id": request_id, "success": False, "error": "Solicitud no encontrada"}
+            continue
         
-        # Obtener información del administrador asignado si existe
-        admin_data = None
-        if request.get("assignedTo"):
-            admin = await db.users.find_one({"_id": request["assignedTo"]})
-            if admin:
-                admin_data = {
-                    "id": str(admin["_id"]),
-                    "firstName": admin["firstName"],
-                    "lastName": admin["lastName"],
-                    "email": admin["email"],
-                    "role": admin.get("role", UserRole.ADMIN)
+        if bulk_update.status:
+            if current[request_oid] not in allowed_from:
+                results[request_id] = {
+                    "id": request_id,
+                    "success": False,
+                    "error": f"No se puede cambiar una solicitud de {current[request_oid]} a {bulk_update.status}"
                 }
-        
-        # Preparar respuesta
-        request_response = {
-            "id": str(request["_id"]),
+                continue
+            operations.append(UpdateOne(
+                {"_id": request_oid, **version_filter(current_requests[request_oid].get("version", 0))},
+                status_transition_update(
+                    bulk_update.status,
+                    ObjectId(current_user.id),
+                    bulk_update.reason,
+                    {**extra_fields, "bulkUpdateId": bulk_update_id}
+                )
+            ))
+        else:
+            operations.append(UpdateOne(
+                {"_id": request_oid, **version_filter(current_requests[request_oid].get("version", 0))},
+                {
+                    "$set": {**extra_fields, "bulkUpdateId": bulk_update_id, "updatedAt": datetime.utcnow()},
+                    "$inc": {"version": 1}
+                }
+            ))
+        pending_ids.append(request_oid)
+    
+    matched = 0
+    modified = 0
+    if operations:
+        result = await db.requests.bulk_write(operations, ordered=False)
+        matched = result.matched_count
+        modified = result.modified_count
+    
+    # Las escrituras que no coincidieron son exactamente las solicitudes que
+    # otro usuario modificó entre la lectura y la escritura
+    conflicts = set()
+    if matched < len(pending_ids):
+        applied = {
+            request["_id"]
+            async for request in db.requests.find(
+                {"_id": {"$in": pending_ids}, "bulkUpdateId": bulk_update_id}, {"_id": 1}
+            )
+        }
+        conflicts = set(pending_ids) - applied
+    if matched:
+        await db.requests.update_many(
+            {"_id": {"$in": pending_ids}, "bulkUpdateId": bulk_update_id},
+            {"$unset": {"bulkUpdateId": ""}}
+        )
+    
+    stats_changes = []
+    for request_oid in pending_ids:
+        request_id = str(request_oid)
+        if request_oid in conflicts:
+            results[request_id] = {"id": request_id, "success": False, "error": "La solicitud fue modificada durante la operación"}
+        else:
+            results[request_id] = {"id": request_id, "success": True}
+            previous = current_requests[request_oid]
+            changed = {**previous, **extra_fields}
+            if bulk_update.status:
+                changed["status"] = bulk_update.status
+            stats_changes.append((previous, changed))
+    await record_request_changes(db, stats_changes)
+    
+    return {
+        "success": True,
+        "matched": matched,
+        "modified": modified,
+        "results": [
+            {**results[str(input_oids[request_id])], "id": request_id} if request_id in input_oids else results[request_id]
+            for request_id in dict.fromkeys(bulk_update.ids)
+        ]
+    }
+
+@router.get("/export")
+async def export_requests(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Formato: csv o ndjson"),
+    status: Optional[str] = Query(None, description="Filtrar por estado"),
+    client_id: Optional[str] = Query(None, description="Filtrar por cliente (solo para administradores)"),
+    search: Optional[str] = Query(None, description="Buscar en título o descripción"),
+    search_mode: str = Query("regex", pattern="^(regex|text)$", description="Búsqueda: regex (por defecto) o text"),
+    tags: Optional[List[str]] = Query(None, description="Filtrar por etiquetas"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="Etiquetas: any o all"),
+    current_user: UserPublic = Depends(get_any_user)
+) -> StreamingResponse:
+    """
+    Exportar solicitudes en CSV o NDJSON con los mismos filtros del listado.
+    Las filas se transmiten desde el cursor de Mongo con memoria constante.
+    """
+    db = get_database()
+    query = build_requests_query(current_user, status, client_id, search, search_mode, tags, tags_mode)
+    
+    documents = db.requests.aggregate(
+        [{"$match": query}, {"$sort": dict(REQUESTS_SORT)}, {"$project": REQUEST_LIST_PROJECTION}],
+        batchSize=EXPORT_BATCH_SIZE
+    )
+    
+    def to_row(request: dict, users: dict) -> dict:
+        client = users.get(request["clientId"]) or {}
+        admin = users.get(request.get("assignedTo")) or {}
+        return {
+            "id": request["_id"],
             "title": request["title"],
             "description": request["description"],
             "status": request["status"],
             "statusLabel": RequestStatus.status_labels().get(request["status"], request["status"]),
-            "clientId": str(request["clientId"]),
-            "client": client_data,
-            "assignedTo": str(request["assignedTo"]) if request.get("assignedTo") else None,
-            "assignedAdmin": admin_data,
+            "clientId": request["clientId"],
+            "clientName": f"{client.get('firstName', '')} {client.get('lastName', '')}".strip(),
+            "clientEmail": client.get("email"),
+            "assignedTo": request.get("assignedTo"),
+            "assignedAdminName": f"{admin.get('firstName', '')} {admin.get('lastName', '')}".strip() or None,
             "amount": request.get("amount"),
             "dueDate": request.get("dueDate"),
             "tags": request.get("tags", []),
-            "commentsCount": len(request.get("comments", [])),
-            "filesCount": len(request.get("files", [])),
+            "commentsCount": request["commentsCount"],
+            "filesCount": request["filesCount"],
             "createdAt": request["createdAt"],
             "updatedAt": request.get("updatedAt")
         }
-        
-        requests_list.append(request_response)
+    
+    rows = export_rows(
+        db,
+        documents,
+        to_row,
+        user_ids=lambda request: (request["clientId"], request.get("assignedTo"))
+    )
+    return export_response(rows, REQUEST_EXPORT_COLUMNS, format, "solicitudes")
+
+@router.get("/stats", response_model=dict)
+async def get_request_stats(
+    client_id: Optional[str] = Query(None, description="Estadísticas de un cliente (solo administradores)"),
+    current_user: UserPublic = Depends(get_any_user)
+) -> dict:
+    """
+    Cantidad de solicitudes y suma de montos por estado, leídas de los
+    contadores materializados en request_stats.
+    Los administradores ven el total y el desglose por administrador asignado;
+    los clientes solo ven sus propias solicitudes.
+    """
+    db = get_database()
+    stats = db[STATS_COLLECTION]
+    
+    if current_user.role == UserRole.CLIENT or client_id:
+        if current_user.role == UserRole.CLIENT:
+            client_oid = ObjectId(current_user.id)
+        elif ObjectId.is_valid(client_id):
+            client_oid = ObjectId(client_id)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ID de cliente inválido"
+            )
+        client_stats = await stats.find_one({"_id": stats_id("client", client_oid)})
+        return {
+            "success": True,
+            "stats": {"clientId": str(client_oid), **stats_summary(client_stats)}
+        }
+    
+    total = await stats.find_one({"_id": GLOBAL_STATS_ID})
+    # Prefijo anclado sobre _id: usa el índice de _id
+    admin_stats = await stats.find({"_id": {"$regex": "^admin:"}}).to_list(length=None)
+    admins = await fetch_users(db, [doc["key"] for doc in admin_stats])
     
     return {
         "success": True,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "requests": requests_list
+        "stats": {
+            **stats_summary(total),
+            "byAdmin": [
+                {"admin": user_summary(admins.get(doc["key"]), UserRole.ADMIN), **stats_summary(doc)}
+                for doc in admin_stats if doc.get("count")
+            ]
+        }
+    }
+
+@router.get("/analytics/sla", response_model=dict)
+async def get_sla_analytics(
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Primer mes incluido (YYYY-MM)"),
+    current_user: UserPublic = Depends(get_admin_user)
+) -> dict:
+    """
+    Percentiles (p50/p90/p99, en horas) del tiempo que las solicitudes pasan
+    en proceso y en revisión, en total, por administrador y por mes
+    (solo administradores).
+    """
+    db = get_database()
+    report = await sla_report(db, from_month)
+    
+    admin_ids = {admin for status_report in report["statuses"].values() for admin in status_report["byAdmin"]}
+    admins = await fetch_users(db, admin_ids)
+    
+    statuses = {}
+    for request_status, status_report in report["statuses"].items():
+        statuses[request_status] = {
+            "label": RequestStatus.status_labels()[request_status],
+            "overall": status_report["overall"],
+            "byAdmin": [
+                {
+                    "admin": user_summary(admins.get(admin), UserRole.ADMIN) or {"id": str(admin)},
+                    **values
+                }
+                for admin, values in status_report["byAdmin"].items()
+            ],
+            "byMonth": [{"month": month, **values} for month, values in status_report["byMonth"].items()]
+        }
+    
+    return {
+        "success": True,
+        "unit": report["unit"],
+        "computedUntil": report["computedUntil"],
+        "statuses": statuses
+    }
+
+@router.get("/tags", response_model=dict)
+async def get_request_tags(
+    prefix: Optional[str] = Query(None, max_length=50, description="Prefijo de la etiqueta (autocompletado)"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de etiquetas"),
+    current_user: UserPublic = Depends(get_admin_user)
+) -> dict:
+    """
+    Etiquetas en uso con la cantidad de solicitudes de cada una, de la más
+    usada a la menos usada (solo administradores).
+    Con `prefix` sirve para autocompletar.
+    """
+    db = get_database()
+    return {
+        "success": True,
+        "tags": await search_tags(db, prefix, limit)
     }
 
+@router.get("/stream")
+async def stream_requests(
+    resume_token: Optional[str] = Query(None, description="Reanudar después de este evento (id del último evento recibido)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: UserPublic = Depends(get_any_user)
+) -> StreamingResponse:
+    """
+    Eventos en tiempo real (Server-Sent Events) con los cambios de las
+    solicitudes, repartidos desde el change stream único del proceso.
+    Los clientes solo reciben eventos de sus propias solicitudes.
+    Si no se puede reanudar desde el último evento recibido se envía un
+    evento `reset` y el cliente debe recargar las solicitudes.
+    Requiere que MongoDB se ejecute como replica set.
+    """
+    subscription = request_events.subscribe(current_user, resume_token or last_event_id)
+    
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            if subscription.missed:
+                yield sse_message({"detail": "No se pudieron recuperar todos los eventos"}, event="reset")
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.REQUEST_STREAM_PING_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Mantener viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                if item is None:
+                    yield sse_message({"detail": "Conexión cerrada por el servidor"}, event="reset")
+                    return
+                event_id, delta = item
+                yield sse_message(delta, event_id=event_id)
+        finally:
+            request_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{request_id}", response_model=dict)
 async def get_request(
+    response: Response,
     request_id: str = Path(..., description="ID de la solicitud"),
     current_user: UserPublic = Depends(get_any_user)
 ) -> dict:
@@ -197,65 +792,29 @@ async def get_request(
             detail="No tienes permiso para ver esta solicitud"
         )
     
-    # Obtener información del cliente
-    client = await db.users.find_one({"_id": request["clientId"]})
-    client_data = None
-    if client:
-        client_data = {
-            "id": str(client["_id"]),
-            "firstName": client["firstName"],
-            "lastName": client["lastName"],
-            "email": client["email"],
-            "role": client.get("role", UserRole.CLIENT)
-        }
+    # Hidratar todos los usuarios referenciados con una sola consulta
+    users = await fetch_users(db, request_user_ids(request))
+    
+    client_data = user_summary(users.get(request["clientId"]), UserRole.CLIENT)
     
     # Obtener información del administrador asignado si existe
     admin_data = None
     if request.get("assignedTo"):
-        admin = await db.users.find_one({"_id": request["assignedTo"]})
-        if admin:
-            admin_data = {
-                "id": str(admin["_id"]),
-                "firstName": admin["firstName"],
-                "lastName": admin["lastName"],
-                "email": admin["email"],
-                "role": admin.get("role", UserRole.ADMIN)
-            }
+        admin_data = user_summary(users.get(request["assignedTo"]), UserRole.ADMIN)
     
     # Preparar comentarios con información de usuario
     comments = []
     for comment in request.get("comments", []):
-        user = await db.users.find_one({"_id": comment["userId"]})
-        user_data = None
-        if user:
-            user_data = {
-                "id": str(user["_id"]),
-                "firstName": user["firstName"],
-                "lastName": user["lastName"],
-                "email": user["email"],
-                "role": user.get("role", UserRole.CLIENT)
-            }
-        
         comments.append({
             "id": str(comment.get("_id", "")),
             "content": comment["content"],
             "createdAt": comment["createdAt"],
-            "user": user_data
+            "user": user_summary(users.get(comment["userId"]))
         })
     
     # Preparar historial de estados con información de usuario
     status_history = []
     for status_change in request.get("statusHistory", []):
-        user = await db.users.find_one({"_id": status_change["changedBy"]})
-        user_data = None
-        if user:
-            user_data = {
-                "id": str(user["_id"]),
-                "firstName": user["firstName"],
-                "lastName": user["lastName"],
-                "role": user.get("role", UserRole.CLIENT)
-            }
-        
         status_history.append({
             "fromStatus": status_change["fromStatus"],
             "fromStatusLabel": RequestStatus.status_labels().get(status_change["fromStatus"], status_change["fromStatus"]) if status_change["fromStatus"] else None,
@@ -263,33 +822,23 @@ async def get_request(
             "toStatusLabel": RequestStatus.status_labels().get(status_change["toStatus"], status_change["toStatus"]),
             "changedAt": status_change["changedAt"],
             "reason": status_change.get("reason"),
-            "changedBy": user_data
+            "changedBy": user_summary(users.get(status_change["changedBy"]), include_email=False)
         })
     
     # Preparar archivos con información de usuario
     files = []
     for file in request.get("files", []):
-        user = await db.users.find_one({"_id": file["userId"]})
-        user_data = None
-        if user:
-            user_data = {
-                "id": str(user["_id"]),
-                "firstName": user["firstName"],
-                "lastName": user["lastName"],
-                "role": user.get("role", UserRole.CLIENT)
-            }
-        
         files.append({
             "id": str(file.get("_id", "")),
             "filename": file["filename"],
             "fileSize": file["fileSize"],
             "fileType": file["fileType"],
             "uploadedAt": file["uploadedAt"],
-            "user": user_data
+            "user": user_summary(users.get(file["userId"]), include_email=False)
         })
     
     # Preparar respuesta detallada
-    response = {
+    request_data = {
         "id": str(request["_id"]),
         "title": request["title"],
         "description": request["description"],
@@ -303,190 +852,196 @@ async def get_request(
         "dueDate": request.get("dueDate"),
         "tags": request.get("tags", []),
         "comments": comments,
+        "commentsCount": request.get("commentsCount", len(comments)),
         "files": files,
         "statusHistory": status_history,
+        "version": request.get("version", 0),
         "createdAt": request["createdAt"],
         "updatedAt": request.get("updatedAt")
     }
+    response.headers["ETag"] = etag(request_data["version"])
     
     return {
         "success": True,
-        "request": response
+        "request": request_data
     }
 
 @router.put("/{request_id}", response_model=dict)
 async def update_request(
+    response: Response,
     request_id: str = Path(..., description="ID de la solicitud"),
     request_update: RequestUpdate = Body(...),
+    if_match: Optional[str] = Header(None, alias="If-Match", description="Versión (ETag) leída de la solicitud"),
     current_user: UserPublic = Depends(get_any_user)
 ) -> dict:
     """
     Actualizar una solicitud existente.
     Los clientes solo pueden actualizar sus propias solicitudes y solo ciertos campos.
     Los administradores pueden actualizar cualquier solicitud y todos los campos.
+    
+    Si se indica la versión leída (cabecera If-Match o campo `version`), la
+    actualización solo se aplica si nadie modificó la solicitud entretanto;
+    en caso contrario responde 409 con la versión actual en el ETag.
     """
     db = get_database()
     
     try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
-    except:
+        request_oid = ObjectId(request_id)
+    except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="ID de solicitud inválido"
         )
     
-    if not request:
+    expected_version = parse_if_match(if_match)
+    if expected_version is None:
+        expected_version = request_update.version
+    
+    # Los clientes no pueden cambiar ciertos campos
+    if current_user.role == UserRole.CLIENT and (request_update.status or request_update.assignedTo):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solicitud no encontrada"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para modificar estos campos"
         )
     
-    # Verificar permisos
-    if current_user.role == UserRole.CLIENT:
-        # Los clientes solo pueden actualizar sus propias solicitudes
-        if str(request["clientId"]) != current_user.id:
+    # Preparar datos para actualizar
+    update_data = {}
+    update_fields = request_update.model_dump(exclude_unset=True, exclude={"version"})
+    
+    for field, value in update_fields.items():
+        if value is None:
+            continue
+        if field == "assignedTo":
+            if not ObjectId.is_valid(value):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="ID de administrador inválido"
+                )
+            # Verificar que el usuario asignado exista y sea admin
+            if not await db.users.find_one({"_id": ObjectId(value), "role": UserRole.ADMIN}, {"_id": 1}):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El usuario asignado debe ser un administrador válido"
+                )
+            update_data[field] = ObjectId(value)
+        elif field == "status" and value not in RequestStatus.all_statuses():
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para actualizar esta solicitud"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Estado no válido"
             )
-        
-        # Los clientes solo pueden actualizar solicitudes en estado DRAFT
-        if request["status"] != RequestStatus.DRAFT:
+        else:
+            update_data[field] = value
+    
+    # Una sola escritura condicional: permisos y versión van en el filtro
+    query = {"_id": request_oid}
+    if current_user.role == UserRole.CLIENT:
+        # Los clientes solo pueden actualizar sus propias solicitudes en estado DRAFT
+        query["clientId"] = ObjectId(current_user.id)
+        query["status"] = RequestStatus.DRAFT
+    if expected_version is not None:
+        query.update(version_filter(expected_version))
+    if "status" in update_data:
+        # Mismas transiciones permitidas que PATCH /{request_id}/status
+        query["status"] = {"$in": RequestStatus.allowed_from(update_data["status"])}
+    
+    now = datetime.utcnow()
+    if "status" in update_data:
+        # Registrar el cambio de estado en el historial en la misma escritura
+        update = status_transition_update(
+            update_data["status"],
+            ObjectId(current_user.id),
+            "Actualización de solicitud",
+            {field: value for field, value in update_data.items() if field != "status"}
+        )
+    else:
+        update = {"$set": {**update_data, "updatedAt": now}, "$inc": {"version": 1}}
+    
+    previous = await db.requests.find_one_and_update(
+        query,
+        update,
+        projection={"comments": 0, "files": 0, "statusHistory": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    
+    if previous is None:
+        # Camino de error: averiguar por qué no hubo coincidencia
+        request = await db.requests.find_one({"_id": request_oid}, {"clientId": 1, "status": 1, "version": 1})
+        if not request:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo puedes modificar solicitudes en estado de borrador"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Solicitud no encontrada"
             )
-        
-        # Los clientes no pueden cambiar ciertos campos
-        if request_update.status or request_update.assignedTo:
+        if current_user.role == UserRole.CLIENT:
+            if str(request["clientId"]) != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="No tienes permiso para actualizar esta solicitud"
+                )
+            if request["status"] != RequestStatus.DRAFT:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Solo puedes modificar solicitudes en estado de borrador"
+                )
+        version_matches = expected_version is None or request.get("version", 0) == expected_version
+        if "status" in update_data and version_matches:
+            # La versión coincide: lo que falló es la transición de estado
+            if request["status"] == update_data["status"]:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La solicitud ya está en estado {update_data['status']}"
+                )
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para modificar estos campos"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No se puede cambiar una solicitud de {request['status']} a {update_data['status']}"
             )
+        raise version_conflict(
+            request.get("version", 0),
+            "La solicitud fue modificada por otro usuario. Vuelve a cargarla e inténtalo de nuevo"
+        )
     
-    # Preparar datos para actualizar
-    update_data = {}
-    update_fields = request_update.model_dump(exclude_unset=True)
-    
-    for field, value in update_fields.items():
-        if value is not None:
-            # Manejar campos especiales
-            if field == "assignedTo" and value:
-                try:
-                    # Verificar que el usuario asignado exista y sea admin
-                    admin = await db.users.find_one({"_id": ObjectId(value), "role": UserRole.ADMIN})
-                    if not admin:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="El usuario asignado debe ser un administrador válido"
-                        )
-                    update_data[field] = ObjectId(value)
-                except:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="ID de administrador inválido"
-                    )
-            elif field == "status":
-                # Verificar que el estado sea válido
-                if value not in RequestStatus.all_statuses():
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Estado no válido"
-                    )
-                
-                # Registrar cambio de estado en el historial
-                status_change = {
-                    "fromStatus": request["status"],
-                    "toStatus": value,
-                    "changedBy": ObjectId(current_user.id),
-                    "changedAt": datetime.utcnow(),
-                    "reason": "Actualización de solicitud"
-                }
-                
-                update_data[field] = value
-                update_data["$push"] = {"statusHistory": status_change}
-            else:
-                update_data[field] = value
-    
-    # Actualizar timestamp
-    update_data["updatedAt"] = datetime.utcnow()
-    
-    # Actualizar la solicitud
-    await db.requests.update_one(
-        {"_id": ObjectId(request_id)},
-        {"$set": update_data}
-    )
+    version = previous.get("version", 0) + 1
+    updated = {**previous, **update_data, "version": version, "updatedAt": now}
+    await record_request_change(db, previous, updated)
+    if "tags" in update_data:
+        await record_tag_change(db, previous.get("tags"), update_data["tags"])
     
+    response.headers["ETag"] = etag(version)
     return {
         "success": True,
-        "message": "Solicitud actualizada correctamente"
+        "message": "Solicitud actualizada correctamente",
+        "version": version
     }
 
 @router.patch("/{request_id}/status", response_model=dict)
 async def change_request_status(
+    response: Response,
     request_id: str = Path(..., description="ID de la solicitud"),
     status_change: StatusChangeRequest = Body(...),
+    if_match: Optional[str] = Header(None, alias="If-Match", description="Versión (ETag) leída de la solicitud"),
     current_user: UserPublic = Depends(get_admin_user)
 ) -> dict:
     """
     Cambiar el estado de una solicitud (solo administradores).
+    Solo se permiten las transiciones definidas en RequestStatus.transitions().
+    Con If-Match el cambio solo se aplica si la solicitud sigue en esa versión.
     """
     db = get_database()
     
-    try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="ID de solicitud inválido"
-        )
-    
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solicitud no encontrada"
-        )
-    
-    # Verificar que el estado sea válido
-    if status_change.status not in RequestStatus.all_statuses():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Estado no válido"
-        )
-    
-    # No permitir cambiar a un estado igual al actual
-    if request["status"] == status_change.status:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"La solicitud ya está en estado {status_change.status}"
-        )
-    
-    # Registrar cambio de estado en el historial
-    status_history_entry = {
-        "fromStatus": request["status"],
-        "toStatus": status_change.status,
-        "changedBy": ObjectId(current_user.id),
-        "changedAt": datetime.utcnow(),
-        "reason": status_change.reason
-    }
-    
-    # Actualizar la solicitud
-    await db.requests.update_one(
-        {"_id": ObjectId(request_id)},
-        {
-            "$set": {
-                "status": status_change.status,
-                "updatedAt": datetime.utcnow()
-            },
-            "$push": {
-                "statusHistory": status_history_entry
-            }
-        }
+    updated = await apply_status_transition(
+        db,
+        request_id,
+        status_change.status,
+        current_user,
+        status_change.reason,
+        RequestStatus.transitions(),
+        parse_if_match(if_match)
     )
     
+    response.headers["ETag"] = etag(updated["version"])
     return {
         "success": True,
-        "message": f"Estado de la solicitud actualizado a {status_change.status}"
+        "message": f"Estado de la solicitud actualizado a {status_change.status}",
+        "version": updated["version"]
     }
 
 @router.post("/{request_id}/comments", response_model=dict)
@@ -502,7 +1057,10 @@ async def add_comment(
     db = get_database()
     
     try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
+        request = await db.requests.find_one(
+            {"_id": ObjectId(request_id)},
+            {"clientId": 1, "commentsCount": 1, "comments": 1}
+        )
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -522,6 +1080,11 @@ async def add_comment(
             detail="No tienes permiso para comentar en esta solicitud"
         )
     
+    # Solicitudes anteriores a la colección request_comments: mover primero
+    # sus comentarios embebidos para no perderlos al recortar el arreglo
+    if "commentsCount" not in request:
+        await move_embedded_comments(db, request)
+    
     # Crear el comentario
     new_comment = {
         "_id": ObjectId(),
@@ -530,14 +1093,35 @@ async def add_comment(
         "createdAt": datetime.utcnow()
     }
     
-    # Añadir el comentario a la solicitud
-    await db.requests.update_one(
-        {"_id": ObjectId(request_id)},
+    # Mantener en la solicitud solo el contador y los más recientes. La
+    # solicitud se actualiza primero, con los permisos en el filtro, y el
+    # comentario se guarda en su colección solo si la solicitud sigue ahí
+    query = {"_id": request["_id"]}
+    if current_user.role == UserRole.CLIENT:
+        query["clientId"] = ObjectId(current_user.id)
+    result = await db.requests.update_one(
+        query,
         {
-            "$push": {"comments": new_comment},
+            "$push": {"comments": {"$each": [new_comment], "$slice": -RECENT_COMMENTS}},
+            "$inc": {"commentsCount": 1},
             "$set": {"updatedAt": datetime.utcnow()}
         }
     )
+    if not result.matched_count:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Solicitud no encontrada"
+        )
+    
+    try:
+        await db.request_comments.insert_one({**new_comment, "requestId": request["_id"]})
+    except Exception:
+        # Deshacer el contador y el comentario embebido
+        await db.requests.update_one(
+            {"_id": request["_id"]},
+            {"$pull": {"comments": {"_id": new_comment["_id"]}}, "$inc": {"commentsCount": -1}}
+        )
+        raise
     
     # Obtener información del usuario para la respuesta
     user_data = {
@@ -558,20 +1142,23 @@ async def add_comment(
         }
     }
 
-@router.delete("/{request_id}", response_model=dict)
-async def delete_request(
+@router.get("/{request_id}/comments", response_model=dict)
+async def get_comments(
     request_id: str = Path(..., description="ID de la solicitud"),
+    skip: int = Query(0, ge=0, description="Número de comentarios a omitir"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de comentarios a devolver"),
     current_user: UserPublic = Depends(get_any_user)
 ) -> dict:
     """
-    Eliminar una solicitud.
-    Los clientes solo pueden eliminar sus propias solicitudes en estado DRAFT.
-    Los administradores pueden eliminar cualquier solicitud.
+    Obtener los comentarios de una solicitud, paginados en orden cronológico.
     """
     db = get_database()
     
     try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
+        request = await db.requests.find_one(
+            {"_id": ObjectId(request_id)},
+            {"clientId": 1, "commentsCount": 1, "comments": 1}
+        )
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -584,93 +1171,119 @@ async def delete_request(
             detail="Solicitud no encontrada"
         )
     
-    # Verificar permisos
-    if current_user.role == UserRole.CLIENT:
-        # Los clientes solo pueden eliminar sus propias solicitudes
-        if str(request["clientId"]) != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para eliminar esta solicitud"
-            )
-        
-        # Los clientes solo pueden eliminar solicitudes en estado DRAFT
-        if request["status"] != RequestStatus.DRAFT:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo puedes eliminar solicitudes en estado de borrador"
-            )
+    if current_user.role == UserRole.CLIENT and str(request["clientId"]) != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para ver esta solicitud"
+        )
     
-    # Eliminar la solicitud
-    await db.requests.delete_one({"_id": ObjectId(request_id)})
+    if "commentsCount" in request:
+        total = request["commentsCount"]
+        cursor = db.request_comments.find({"requestId": request["_id"]}) \
+            .sort([("createdAt", 1), ("_id", 1)]).skip(skip).limit(limit)
+        page = await cursor.to_list(length=limit)
+    else:
+        # Solicitud sin migrar: los comentarios siguen embebidos
+        total = len(request.get("comments", []))
+        page = request.get("comments", [])[skip:skip + limit]
+    
+    users = await fetch_users(db, [comment["userId"] for comment in page])
+    comments = [
+        {
+            "id": str(comment["_id"]),
+            "content": comment["content"],
+            "createdAt": comment["createdAt"],
+            "user": user_summary(users.get(comment["userId"]))
+        }
+        for comment in page
+    ]
     
     return {
         "success": True,
-        "message": "Solicitud eliminada correctamente"
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "comments": comments
     }
 
-@router.post("/{request_id}/submit", response_model=dict)
-async def submit_request(
+@router.delete("/{request_id}", response_model=dict)
+async def delete_request(
     request_id: str = Path(..., description="ID de la solicitud"),
-    current_user: UserPublic = Depends(get_client_user)
+    current_user: UserPublic = Depends(get_any_user)
 ) -> dict:
     """
-    Enviar una solicitud para revisión (solo clientes).
-    Cambia el estado de DRAFT a IN_PROCESS.
+    Eliminar una solicitud.
+    Los clientes solo pueden eliminar sus propias solicitudes en estado DRAFT.
+    Los administradores pueden eliminar cualquier solicitud.
     """
     db = get_database()
     
     try:
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
-    except:
+        request_oid = ObjectId(request_id)
+    except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="ID de solicitud inválido"
         )
     
-    if not request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solicitud no encontrada"
-        )
+    # Los permisos van en el filtro: la solicitud no puede cambiar de dueño
+    # o de estado entre la verificación y el borrado
+    query = {"_id": request_oid}
+    if current_user.role == UserRole.CLIENT:
+        query["clientId"] = ObjectId(current_user.id)
+        query["status"] = RequestStatus.DRAFT
     
-    # Verificar que sea la solicitud del cliente
-    if str(request["clientId"]) != current_user.id:
+    request = await db.requests.find_one_and_delete(query)
+    if not request:
+        current = await db.requests.find_one({"_id": request_oid}, {"clientId": 1, "status": 1})
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Solicitud no encontrada"
+            )
+        # Los clientes solo pueden eliminar sus propias solicitudes
+        if str(current["clientId"]) != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para eliminar esta solicitud"
+            )
+        # Los clientes solo pueden eliminar solicitudes en estado DRAFT
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para enviar esta solicitud"
+            detail="Solo puedes eliminar solicitudes en estado de borrador"
         )
     
-    # Verificar que esté en estado DRAFT
-    if request["status"] != RequestStatus.DRAFT:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Solo puedes enviar solicitudes en estado de borrador"
-        )
+    # Estadísticas a partir del documento efectivamente eliminado
+    await record_request_change(db, request, None)
+    await record_tag_change(db, request.get("tags"), None)
+    await db.request_comments.delete_many({"requestId": request_oid})
     
-    # Registrar cambio de estado en el historial
-    status_history_entry = {
-        "fromStatus": RequestStatus.DRAFT,
-        "toStatus": RequestStatus.IN_PROCESS,
-        "changedBy": ObjectId(current_user.id),
-        "changedAt": datetime.utcnow(),
-        "reason": "Solicitud enviada para revisión"
+    return {
+        "success": True,
+        "message": "Solicitud eliminada correctamente"
     }
+
+@router.post("/{request_id}/submit", response_model=dict)
+async def submit_request(
+    request_id: str = Path(..., description="ID de la solicitud"),
+    current_user: UserPublic = Depends(get_client_user)
+) -> dict:
+    """
+    Enviar una solicitud para revisión (solo clientes).
+    Cambia el estado de DRAFT a IN_PROCESS.
+    """
+    db = get_database()
     
-    # Actualizar la solicitud
-    await db.requests.update_one(
-        {"_id": ObjectId(request_id)},
-        {
-            "$set": {
-                "status": RequestStatus.IN_PROCESS,
-                "updatedAt": datetime.utcnow()
-            },
-            "$push": {
-                "statusHistory": status_history_entry
-            }
-        }
+    await apply_status_transition(
+        db,
+        request_id,
+        RequestStatus.IN_PROCESS,
+        current_user,
+        "Solicitud enviada para revisión",
+        RequestStatus.client_transitions()
     )
     
     return {
         "success": True,
         "message": "Solicitud enviada correctamente para revisión"
-    }
\ No newline at end of file
+    }
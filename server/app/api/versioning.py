@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+# Control de concurrencia optimista: cada escritura incrementa `version` y
+# las actualizaciones solo se aplican si el documento sigue en la versión
+# que leyó el cliente (enviada en If-Match o en el cuerpo).
+
+def etag(version: int) -> str:
+    """ETag header value for a document version."""
+    return f'"{version}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Read the expected version from an If-Match header ("3", W/"3" or 3).
+    Returns None when the header is absent or is `*`.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cabecera If-Match inválida"
+        )
+    return int(value)
+
+def version_filter(version: int) -> dict:
+    """Filter matching documents at `version`; documents without the field are version 0."""
+    if version:
+        return {"version": version}
+    return {"version": {"$in": [0, None]}}
+
+def version_conflict(current_version: int, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail,
+        headers={"ETag": etag(current_version)}
+    )
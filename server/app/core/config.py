@@ -30,10 +30,44 @@ class Settings(BaseSettings):
     # MongoDB settings
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://mongo:27017/encodergroup")
     
+    # Límite del conteo aproximado en listados (count=estimate)
+    REQUESTS_COUNT_ESTIMATE_CAP: int = int(os.getenv("REQUESTS_COUNT_ESTIMATE_CAP", "10000"))
+    
+    # Comentarios recientes que se mantienen embebidos en cada solicitud
+    REQUEST_RECENT_COMMENTS: int = int(os.getenv("REQUEST_RECENT_COMMENTS", "5"))
+    
+    # Segundos que se reutiliza el reporte de SLA antes de recalcular los intervalos nuevos
+    SLA_ANALYTICS_CACHE_SECONDS: int = int(os.getenv("SLA_ANALYTICS_CACHE_SECONDS", "300"))
+    # Atraso de la marca de agua del SLA respecto de la hora actual (transiciones aún sin confirmar)
+    SLA_WATERMARK_LAG_SECONDS: int = int(os.getenv("SLA_WATERMARK_LAG_SECONDS", "60"))
+    # Lease de la actualización del SLA: si el proceso muere, otro la retoma al vencer
+    SLA_REFRESH_LEASE_SECONDS: int = int(os.getenv("SLA_REFRESH_LEASE_SECONDS", "600"))
+    
+    # Intervalo de keep-alive del stream de eventos de solicitudes (SSE)
+    REQUEST_STREAM_PING_SECONDS: int = int(os.getenv("REQUEST_STREAM_PING_SECONDS", "15"))
+    # Eventos recientes conservados para reanudar conexiones y tamaño de la cola de cada conexión
+    REQUEST_STREAM_BUFFER_SIZE: int = int(os.getenv("REQUEST_STREAM_BUFFER_SIZE", "1000"))
+    REQUEST_STREAM_QUEUE_SIZE: int = int(os.getenv("REQUEST_STREAM_QUEUE_SIZE", "256"))
+    
     # JWT settings
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your_jwt_secret_key_changeme")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 30  # 30 days
+    # Si está activo, el token incluye rol y perfil y no se consulta Mongo por petición
+    STATELESS_PRINCIPAL: bool = os.getenv("STATELESS_PRINCIPAL", "False").lower() in ("true", "1", "t")
+    TOKEN_VERSION_REFRESH_SECONDS: int = int(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "30"))
+    # Caché de tokens JWT ya verificados
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "3600"))
+    
+    # Principal cache settings (usuarios autenticados en memoria)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    
+    # Password hashing pool settings ("process" o "thread")
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
     
     # SMTP settings for sending emails via cPanel
     SMTP_HOST: str = os.getenv("SMTP_HOST", "")
@@ -42,6 +76,26 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     SMTP_SSL: bool = os.getenv("SMTP_SSL", "True").lower() in ("true", "1", "t")
     SMTP_VERIFY_SSL: bool = os.getenv("SMTP_VERIFY_SSL", "True").lower() in ("true", "1", "t")
+    # Pool de conexiones SMTP persistentes
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_POOL_MAX_MESSAGES: int = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+    SMTP_POOL_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT_SECONDS", "60"))
+    
+    # Outbound email queue settings (colección email_outbox)
+    EMAIL_QUEUE_WORKERS: int = int(os.getenv("EMAIL_QUEUE_WORKERS", "2"))
+    EMAIL_QUEUE_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("EMAIL_QUEUE_DRAIN_TIMEOUT_SECONDS", "10"))
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "10"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+    EMAIL_OUTBOX_LOCK_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_LOCK_SECONDS", "300"))
+    
+    # Recordatorios de vencimiento de solicitudes (dueDate)
+    DUE_REMINDERS_ENABLED: bool = os.getenv("DUE_REMINDERS_ENABLED", "True").lower() in ("true", "1", "t")
+    DUE_REMINDER_INTERVAL_SECONDS: float = float(os.getenv("DUE_REMINDER_INTERVAL_SECONDS", "300"))
+    DUE_REMINDER_WINDOW_HOURS: float = float(os.getenv("DUE_REMINDER_WINDOW_HOURS", "24"))
+    DUE_REMINDER_LEASE_SECONDS: float = float(os.getenv("DUE_REMINDER_LEASE_SECONDS", "600"))
+    DUE_REMINDER_BATCH_SIZE: int = int(os.getenv("DUE_REMINDER_BATCH_SIZE", "100"))
     
     # Legacy SendGrid settings (kept for backwards compatibility)
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
@@ -1,14 +1,17 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.database import Database
 from app.core.config import settings
+from app.core.indexes import ensure_indexes
 
 # MongoDB client instance
 client = None
 db = None
+# Resultado de la última sincronización de índices
+index_report = {}
 
 async def connect_to_mongo():
     """Connect to MongoDB."""
-    global client, db
+    global client, db, index_report
     try:
         client = AsyncIOMotorClient(settings.MONGO_URI)
         # Extraer el nombre de la base de datos de la URI
@@ -19,6 +22,13 @@ async def connect_to_mongo():
         db = client[db_name]
         print(f"Connected to MongoDB at {settings.MONGO_URI}")
         print(f"Using database: {db_name}")
+        
+        index_report = await ensure_indexes(db)
+        print(f"Índices creados: {index_report['created'] or 'ninguno'}")
+        if index_report["missing"]:
+            print(f"ADVERTENCIA: índices faltantes: {index_report['missing']}")
+        if index_report["unused"]:
+            print(f"Índices sin uso: {index_report['unused']}")
     except Exception as e:
         print(f"Failed to connect to MongoDB: {e}")
         raise
@@ -0,0 +1,249 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.email_queue import email_outbox
+from app.models.request import RequestStatus
+from app.templates.due_date_reminder import get_due_date_reminder_template
+
+LEASE_ID = "due_date_reminders"
+
+# Estados abiertos que generan recordatorio y a quién se avisa:
+# el cliente debe enviar sus borradores; el administrador asignado, resolver
+OPEN_STATUSES = [RequestStatus.DRAFT, RequestStatus.IN_PROCESS, RequestStatus.IN_REVIEW]
+
+
+class DueDateReminders:
+    """
+    Planificador en proceso de recordatorios de vencimiento.
+
+    Cada `interval_seconds` barre las solicitudes abiertas cuyo dueDate cae
+    en las próximas `window_hours` (índice (status, dueDate)), agrupa los
+    recordatorios por destinatario y los encola en email_outbox en lotes.
+    Solo el proceso que tiene el lease de la colección `scheduler_leases`
+    barre, así que varios workers de la API no envían dos veces. Cada
+    solicitud guarda el dueDate ya recordado (`dueReminderFor`): si la fecha
+    cambia, se vuelve a recordar. La marca se escribe antes de encolar el
+    correo, así que una caída entre ambos pasos puede omitir un recordatorio
+    pero nunca enviarlo dos veces.
+    """
+
+    def __init__(self, interval_seconds: float = 300.0, window_hours: float = 24.0,
+                 lease_seconds: float = 600.0, batch_size: int = 100):
+        self.interval_seconds = interval_seconds
+        self.window_hours = window_hours
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.owner = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.sweeps = 0
+        self.skipped = 0
+        self.reminded = 0
+        self.emails = 0
+        self.errors = 0
+        self.last_sweep_at: Optional[datetime] = None
+
+    def start(self):
+        """Start the periodic sweep."""
+        if self._task is not None:
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sweep and release the lease so another worker can take over."""
+        if self._task is None:
+            return
+        self._stop_event.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await get_database().scheduler_leases.delete_one({"_id": LEASE_ID, "owner": self.owner})
+        except Exception as e:
+            print(f"Error liberando el lease de recordatorios: {e}")
+
+    async def _acquire_lease(self, now: datetime) -> bool:
+        """Take or renew the lease; False while another worker holds it."""
+        db = get_database()
+        try:
+            lease = await db.scheduler_leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # El lease existe, no venció y pertenece a otro worker
+            return False
+        return lease is not None and lease["owner"] == self.owner
+
+    async def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                await self.sweep()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error en el barrido de recordatorios de vencimiento: {e}")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _recipient(request: Dict[str, Any]):
+        if request["status"] == RequestStatus.DRAFT:
+            return request["clientId"]
+        return request.get("assignedTo")
+
+    async def _mark_batch(self, requests: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Mark the requests as reminded for their current dueDate before the
+        e-mails are enqueued, so a crash between both steps can skip a
+        reminder but never send it twice. Only requests not yet reminded for
+        that dueDate are marked; returns their ids and the batch id, or None
+        if the marks could not be written.
+        """
+        db = get_database()
+        batch_id = uuid.uuid4().hex
+        marks = [
+            UpdateOne(
+                {"_id": request["_id"], "dueDate": request["dueDate"], "dueReminderFor": {"$ne": request["dueDate"]}},
+                {"$set": {"dueReminderFor": request["dueDate"], "dueReminderBatch": batch_id}}
+            )
+            for request in requests
+        ]
+        try:
+            result = await db.requests.bulk_write(marks, ordered=False)
+            if result.matched_count == len(marks):
+                ids = {request["_id"] for request in requests}
+            else:
+                ids = {
+                    request["_id"]
+                    async for request in db.requests.find({"dueReminderBatch": batch_id}, {"_id": 1})
+                }
+        except Exception as e:
+            self.errors += 1
+            print(f"Error marcando recordatorios de vencimiento: {e}")
+            await self._release_batch(batch_id, unmark=True)
+            return None
+        return {"batchId": batch_id, "ids": ids}
+
+    async def _release_batch(self, batch_id: str, unmark: bool = False):
+        """Drop the batch marker; with `unmark`, also the reminder mark (nothing was sent)."""
+        fields = {"dueReminderBatch": ""}
+        if unmark:
+            fields["dueReminderFor"] = ""
+        try:
+            await get_database().requests.update_many({"dueReminderBatch": batch_id}, {"$unset": fields})
+        except Exception as e:
+            print(f"Error liberando el lote de recordatorios {batch_id}: {e}")
+
+    async def sweep(self) -> int:
+        """
+        Run one sweep if this worker holds the lease. Returns the number of
+        requests reminded.
+        """
+        now = datetime.utcnow()
+        if not await self._acquire_lease(now):
+            self.skipped += 1
+            return 0
+
+        db = get_database()
+        self.sweeps += 1
+        self.last_sweep_at = now
+        cursor = db.requests.find(
+            {"status": {"$in": OPEN_STATUSES},
+             "dueDate": {"$gte": now, "$lte": now + timedelta(hours=self.window_hours)}},
+            {"title": 1, "status": 1, "clientId": 1, "assignedTo": 1, "dueDate": 1, "dueReminderFor": 1}
+        )
+
+        by_recipient: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        async for request in cursor:
+            recipient = self._recipient(request)
+            # Ya recordada para esta fecha, o en proceso sin administrador asignado
+            if request.get("dueReminderFor") == request["dueDate"] or recipient is None:
+                continue
+            by_recipient[recipient].append(request)
+
+        if not by_recipient:
+            return 0
+
+        users = {
+            user["_id"]: user
+            async for user in db.users.find(
+                {"_id": {"$in": list(by_recipient)}}, {"firstName": 1, "lastName": 1, "email": 1}
+            )
+        }
+        labels = RequestStatus.status_labels()
+        requests_url = f"{settings.CLIENT_URL}/requests"
+
+        reminded = 0
+        recipients = [user_id for user_id in by_recipient if user_id in users]
+        for offset in range(0, len(recipients), self.batch_size):
+            batch = recipients[offset:offset + self.batch_size]
+            marked = await self._mark_batch([request for user_id in batch for request in by_recipient[user_id]])
+            if marked is None:
+                continue
+
+            messages = []
+            for user_id in batch:
+                user = users[user_id]
+                requests = sorted(
+                    (request for request in by_recipient[user_id] if request["_id"] in marked["ids"]),
+                    key=lambda request: request["dueDate"]
+                )
+                if not requests:
+                    continue
+                html_content, text_content = get_due_date_reminder_template(
+                    f"{user['firstName']} {user['lastName']}",
+                    [{**request, "statusLabel": labels.get(request["status"], request["status"])} for request in requests],
+                    requests_url
+                )
+                subject = "Solicitud por vencer" if len(requests) == 1 else f"{len(requests)} solicitudes por vencer"
+                messages.append({
+                    "to_email": user["email"],
+                    "subject": subject,
+                    "text_content": text_content,
+                    "html_content": html_content,
+                })
+
+            if await email_outbox.enqueue_many(messages) != len(messages):
+                # Deshacer las marcas: el siguiente barrido lo reintenta
+                self.errors += 1
+                await self._release_batch(marked["batchId"], unmark=True)
+                continue
+            await self._release_batch(marked["batchId"])
+            self.emails += len(messages)
+            reminded += len(marked["ids"])
+
+        self.reminded += reminded
+        return reminded
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "intervalSeconds": self.interval_seconds,
+            "windowHours": self.window_hours,
+            "sweeps": self.sweeps,
+            "skippedNotLeaseHolder": self.skipped,
+            "reminded": self.reminded,
+            "emails": self.emails,
+            "errors": self.errors,
+            "lastSweepAt": self.last_sweep_at,
+        }
+
+
+due_date_reminders = DueDateReminders(
+    interval_seconds=settings.DUE_REMINDER_INTERVAL_SECONDS,
+    window_hours=settings.DUE_REMINDER_WINDOW_HOURS,
+    lease_seconds=settings.DUE_REMINDER_LEASE_SECONDS,
+    batch_size=settings.DUE_REMINDER_BATCH_SIZE,
+)
@@ -0,0 +1,275 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.email_service import send_email
+
+# Estados de un mensaje en la colección email_outbox
+class OutboxStatus:
+    PENDING = "pending"  # Esperando envío (o reintento)
+    SENDING = "sending"  # Reclamado por un worker
+    SENT = "sent"        # Enviado
+    DEAD = "dead"        # Superó el máximo de intentos
+
+    @classmethod
+    def all_statuses(cls):
+        return [cls.PENDING, cls.SENDING, cls.SENT, cls.DEAD]
+
+
+class EmailOutbox:
+    """
+    Cola persistente de correos salientes respaldada por la colección
+    `email_outbox`.
+
+    Los endpoints insertan el mensaje y responden de inmediato. Un grupo de
+    workers reclama lotes de mensajes pendientes, los envía en hilos
+    (smtplib es bloqueante) y reprograma los fallos con backoff exponencial
+    hasta `max_attempts`, tras lo cual quedan en estado `dead` para
+    reencolarlos manualmente. Un mensaje reclamado por un worker que muere
+    vuelve a estar disponible al vencer `lock_seconds`.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 10, max_attempts: int = 5,
+                 backoff_seconds: float = 30.0, poll_seconds: float = 5.0,
+                 lock_seconds: float = 300.0, drain_timeout: float = 10.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.lock_seconds = lock_seconds
+        self.drain_timeout = drain_timeout
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self._send_seconds = 0.0
+        self._max_send_seconds = 0.0
+
+    def start(self):
+        """Start the worker tasks."""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """
+        Let workers finish the batch in progress (up to drain_timeout) and
+        stop them. Unsent messages remain in the outbox.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @staticmethod
+    def _message(to_email: str, subject: str, text_content: str, html_content: str) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "to": to_email,
+            "subject": subject,
+            "textContent": text_content,
+            "htmlContent": html_content,
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "nextAttemptAt": now,
+            "lastError": None,
+            "createdAt": now,
+            "updatedAt": None,
+        }
+
+    async def enqueue(self, to_email: str, subject: str, text_content: str, html_content: str) -> bool:
+        """Store an e-mail in the outbox for delivery."""
+        return await self.enqueue_many([{
+            "to_email": to_email,
+            "subject": subject,
+            "text_content": text_content,
+            "html_content": html_content,
+        }]) == 1
+
+    async def enqueue_many(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Store several e-mails in one round trip. Each message is a dict with
+        to_email, subject, text_content and html_content.
+        """
+        if not messages:
+            return 0
+        db = get_database()
+        try:
+            result = await db.email_outbox.insert_many(
+                [self._message(**message) for message in messages], ordered=False
+            )
+        except Exception as e:
+            print(f"Error encolando correos: {e}")
+            return 0
+        self.enqueued += len(result.inserted_ids)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return len(result.inserted_ids)
+
+    async def _claim_batch(self) -> List[Dict[str, Any]]:
+        """Atomically claim up to batch_size due messages for this worker."""
+        db = get_database()
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": OutboxStatus.PENDING, "nextAttemptAt": {"$lte": now}},
+            {"status": OutboxStatus.SENDING, "lockedUntil": {"$lt": now}},
+        ]}
+        candidates = await db.email_outbox.find(due, {"_id": 1}) \
+            .sort("nextAttemptAt", 1).limit(self.batch_size).to_list(length=self.batch_size)
+        if not candidates:
+            return []
+
+        # Solo se reclaman los que sigan disponibles: otro worker pudo ganarlos
+        claim_id = uuid.uuid4().hex
+        await db.email_outbox.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, **due},
+            {"$set": {
+                "status": OutboxStatus.SENDING,
+                "claimId": claim_id,
+                "lockedUntil": now + timedelta(seconds=self.lock_seconds),
+            }},
+        )
+        return await db.email_outbox.find({"claimId": claim_id}).to_list(length=self.batch_size)
+
+    async def _deliver(self, message: Dict[str, Any]):
+        db = get_database()
+        attempts = message.get("attempts", 0) + 1
+        started = time.perf_counter()
+        error = None
+        try:
+            ok = await asyncio.to_thread(
+                send_email,
+                to_email=message["to"],
+                subject=message["subject"],
+                text_content=message["textContent"],
+                html_content=message["htmlContent"],
+            )
+            if not ok:
+                error = "SMTP send failed"
+        except Exception as e:
+            error = str(e)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._send_seconds += elapsed
+            self._max_send_seconds = max(self._max_send_seconds, elapsed)
+
+        now = datetime.utcnow()
+        if error is None:
+            self.sent += 1
+            update = {"$set": {"status": OutboxStatus.SENT, "attempts": attempts,
+                               "sentAt": now, "updatedAt": now, "lastError": None}}
+        elif attempts >= self.max_attempts:
+            self.failed += 1
+            self.dead += 1
+            print(f"Correo a {message['to']} descartado tras {attempts} intentos: {error}")
+            update = {"$set": {"status": OutboxStatus.DEAD, "attempts": attempts,
+                               "updatedAt": now, "lastError": error}}
+        else:
+            self.failed += 1
+            delay = self.backoff_seconds * (2 ** (attempts - 1))
+            update = {"$set": {"status": OutboxStatus.PENDING, "attempts": attempts,
+                               "nextAttemptAt": now + timedelta(seconds=delay),
+                               "updatedAt": now, "lastError": error}}
+        update["$unset"] = {"claimId": "", "lockedUntil": ""}
+        # Solo si el reclamo sigue siendo de este worker: si el lock venció,
+        # otro worker pudo reclamar el mensaje y su estado manda
+        result = await db.email_outbox.update_one({"_id": message["_id"], "claimId": message["claimId"]}, update)
+        if not result.matched_count:
+            print(f"Correo {message['_id']} reclamado por otro worker; se descarta el resultado")
+
+    async def _worker(self, worker_id: int):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                batch = await self._claim_batch()
+            except Exception as e:
+                print(f"Error reclamando correos en worker {worker_id}: {e}")
+                batch = []
+
+            for message in batch:
+                try:
+                    await self._deliver(message)
+                except Exception as e:
+                    # El mensaje queda reclamado y se reintenta al vencer lockedUntil
+                    print(f"Error registrando el envío de correo en worker {worker_id}: {e}")
+
+            if batch or self._stopping:
+                continue
+            # Nada pendiente: esperar un nuevo mensaje o el siguiente sondeo
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def requeue(self, ids: Optional[List[Any]] = None) -> int:
+        """
+        Move dead messages (all of them, or only `ids`) back to pending with
+        a fresh attempt counter.
+        """
+        db = get_database()
+        query: Dict[str, Any] = {"status": OutboxStatus.DEAD}
+        if ids:
+            query["_id"] = {"$in": ids}
+        result = await db.email_outbox.update_many(
+            query,
+            {"$set": {"status": OutboxStatus.PENDING, "attempts": 0,
+                      "nextAttemptAt": datetime.utcnow(), "updatedAt": datetime.utcnow()}},
+        )
+        if result.modified_count and self._wakeup is not None:
+            self._wakeup.set()
+        return result.modified_count
+
+    async def stats(self) -> dict:
+        """Return outbox depth per status and send latency metrics."""
+        db = get_database()
+        counts = {s: 0 for s in OutboxStatus.all_statuses()}
+        async for row in db.email_outbox.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[row["_id"]] = row["count"]
+
+        processed = self.sent + self.failed
+        return {
+            "workers": self.workers,
+            "depth": counts[OutboxStatus.PENDING] + counts[OutboxStatus.SENDING],
+            "byStatus": counts,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead": self.dead,
+            "avgSendMs": round(self._send_seconds / processed * 1000, 2) if processed else 0.0,
+            "maxSendMs": round(self._max_send_seconds * 1000, 2),
+        }
+
+
+email_outbox = EmailOutbox(
+    workers=settings.EMAIL_QUEUE_WORKERS,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    backoff_seconds=settings.EMAIL_OUTBOX_BACKOFF_SECONDS,
+    poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    lock_seconds=settings.EMAIL_OUTBOX_LOCK_SECONDS,
+    drain_timeout=settings.EMAIL_QUEUE_DRAIN_TIMEOUT_SECONDS,
+)
+
+
+async def enqueue_email(to_email: str, subject: str, text_content: str, html_content: str) -> bool:
+    """Store an e-mail in the application's outbox."""
+    return await email_outbox.enqueue(to_email, subject, text_content, html_content)
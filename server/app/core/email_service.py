@@ -1,13 +1,11 @@
 import smtplib
 import ssl
-import os
-import json
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from app.core.config import settings
-import datetime
-import re
+import threading
+import time
 
 def send_email(to_email, subject, text_content, html_content):
     """
@@ -49,9 +47,158 @@ def send_email(to_email, subject, text_content, html_content):
         print("El usuario deberá usar la URL manual para completar el proceso.")
         return False
 
+class SMTPConnectionPool:
+    """
+    Pool de conexiones SMTP autenticadas reutilizables.
+
+    Las conexiones se mantienen abiertas entre envíos (hasta `idle_timeout`
+    segundos o `max_messages` mensajes por sesión), se limita la cantidad de
+    sesiones simultáneas a `max_connections` y se reconecta automáticamente
+    si el servidor cerró la sesión. Es thread-safe: los workers de la cola
+    de correos envían desde hilos.
+    """
+
+    def __init__(self, host, port, username, password, use_ssl=True, verify_ssl=True,
+                 max_connections=2, max_messages=100, idle_timeout=60.0, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.verify_ssl = verify_ssl
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []  # [(server, last_used, messages_sent)]
+        self._context = None
+        self.connections_opened = 0
+        self.sessions_reused = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+
+    def _ssl_context(self):
+        # El contexto SSL se construye una sola vez y se comparte entre conexiones
+        if self._context is None:
+            if self.verify_ssl:
+                self._context = ssl.create_default_context()
+            else:
+                # Contexto SSL que ignora completamente los problemas de certificado
+                self._context = ssl._create_unverified_context()
+        return self._context
+
+    def _connect(self):
+        print(f"Conectando a servidor SMTP: {self.host}:{self.port}")
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, context=self._ssl_context(), timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls(context=self._ssl_context())
+                server.ehlo()
+        if self.username:
+            server.login(self.username, self.password)
+        self.connections_opened += 1
+        return server, 0
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _checkout(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                server, last_used, sent = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    self.sessions_reused += 1
+                    return server, sent
+                self._close(server)
+        return self._connect()
+
+    def _checkin(self, server, sent):
+        if sent >= self.max_messages:
+            self._close(server)
+            return
+        with self._lock:
+            self._idle.append((server, time.monotonic(), sent))
+
+    def send(self, from_addr, to_addrs, message):
+        """
+        Send a message reusing an idle session when possible. Retries once
+        on a fresh connection if the pooled session was dropped by the server.
+        """
+        with self._semaphore:
+            server, sent = self._checkout()
+            try:
+                server.sendmail(from_addr, to_addrs, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, smtplib.SMTPHeloError):
+                self._close(server)
+                self.reconnects += 1
+                server, sent = self._connect()
+                try:
+                    server.sendmail(from_addr, to_addrs, message)
+                except Exception:
+                    self._close(server)
+                    raise
+            except smtplib.SMTPResponseException as e:
+                # 421: el servidor cerrará la sesión; no la devolvemos al pool
+                if e.smtp_code == 421:
+                    self._close(server)
+                else:
+                    self._checkin(server, sent)
+                raise
+            except smtplib.SMTPException:
+                self._checkin(server, sent)
+                raise
+            except Exception:
+                self._close(server)
+                raise
+            self.messages_sent += 1
+            self._checkin(server, sent + 1)
+
+    def close_all(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _, _ in idle:
+            self._close(server)
+
+    def stats(self):
+        return {
+            "maxConnections": self.max_connections,
+            "idle": len(self._idle),
+            "connectionsOpened": self.connections_opened,
+            "sessionsReused": self.sessions_reused,
+            "reconnects": self.reconnects,
+            "messagesSent": self.messages_sent,
+        }
+
+
+smtp_pool = SMTPConnectionPool(
+    host=settings.SMTP_HOST,
+    port=settings.SMTP_PORT,
+    username=settings.SMTP_USER,
+    password=settings.SMTP_PASSWORD,
+    use_ssl=settings.SMTP_SSL,
+    verify_ssl=settings.SMTP_VERIFY_SSL,
+    max_connections=settings.SMTP_POOL_SIZE,
+    max_messages=settings.SMTP_POOL_MAX_MESSAGES,
+    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+)
+
 def _send_email_via_smtp(msg, to_email):
     """
-    Envía un correo electrónico usando el servidor SMTP configurado.
+    Envía un correo electrónico usando el pool de conexiones SMTP.
     
     Args:
         msg: El mensaje MIMEMultipart configurado
@@ -60,37 +207,13 @@ def _send_email_via_smtp(msg, to_email):
     Returns:
         bool: True si el envío fue exitoso, False en caso contrario
     """
-    server = None
     try:
-        print(f"Conectando a servidor SMTP: {settings.SMTP_HOST}:{settings.SMTP_PORT}")
-        
-        # Configurar el contexto SSL según las preferencias de verificación
-        if settings.SMTP_VERIFY_SSL:
-            context = ssl.create_default_context()
-            print("Usando verificación SSL estándar")
-        else:
-            # Crear un contexto SSL que ignore completamente los problemas de certificado
-            context = ssl._create_unverified_context()
-            print("Verificación SSL completamente desactivada")
-            
-        # Establecer conexión SMTP con el contexto personalizado
-        server = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT, context=context)
-        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.sendmail(settings.SMTP_USER, to_email, msg.as_string())
+        smtp_pool.send(settings.SMTP_USER, to_email, msg.as_string())
         print(f"Correo enviado exitosamente a {to_email}")
         return True
-        
     except Exception as e:
         print(f"Error al enviar email: {str(e)}")
         return False
-        
-    finally:
-        # Asegurar que siempre cerremos la conexión SMTP
-        if server:
-            try:
-                server.quit()
-            except Exception:
-                pass
 
 def _send_email_via_backup(msg, to_email):
     """
@@ -0,0 +1,119 @@
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+# Registro declarativo de índices. Cada entrada se aplica de forma idempotente
+# al iniciar la API (ver connect_to_mongo). Para añadir un índice basta con
+# agregarlo aquí con un nombre estable.
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "users": [
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+        {"name": "reset_password_token", "keys": [("resetPasswordToken", ASCENDING)], "sparse": True},
+        {"name": "email_verification_token", "keys": [("emailVerificationToken", ASCENDING)], "sparse": True},
+    ],
+    "requests": [
+        # (createdAt, _id) respalda el orden estable y la paginación por cursor
+        # Listado por defecto de un cliente (sin filtro de estado): sin este índice
+        # cada página se ordenaría en memoria sobre todas sus solicitudes
+        {"name": "client_created_id", "keys": [("clientId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "client_status_created_id", "keys": [("clientId", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "created_id", "keys": [("createdAt", DESCENDING), ("_id", DESCENDING)]},
+        # Índice multikey: solicitudes con cambios de estado recientes (analítica de SLA)
+        {"name": "status_history_changed", "keys": [("statusHistory.changedAt", ASCENDING)]},
+        # Barrido de recordatorios de vencimiento
+        {"name": "status_due_date", "keys": [("status", ASCENDING), ("dueDate", ASCENDING)]},
+        # Índice multikey para filtrar por etiquetas
+        {"name": "tags", "keys": [("tags", ASCENDING)]},
+        # Búsqueda de texto completo con stemming en español
+        {
+            "name": "text_search",
+            "keys": [("title", TEXT), ("description", TEXT), ("tags", TEXT)],
+            "weights": {"title": 10, "tags": 5, "description": 1},
+            "default_language": "spanish",
+        },
+    ],
+    "request_comments": [
+        # Respalda la página de comentarios ordenada por (createdAt, _id) sin ordenar en memoria;
+        # reemplaza a "request_created", que ensure_indexes reporta como no declarado
+        {"name": "request_created_id", "keys": [("requestId", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)]},
+    ],
+    "request_tags": [
+        # Autocompletado por prefijo (regex anclada)
+        {"name": "normalized", "keys": [("normalized", ASCENDING)]},
+    ],
+    "request_sla_intervals": [
+        # Reporte de SLA por estado y desde un mes
+        {"name": "status_month", "keys": [("status", ASCENDING), ("month", ASCENDING)]},
+    ],
+    "email_outbox": [
+        {"name": "status_next_attempt", "keys": [("status", ASCENDING), ("nextAttemptAt", ASCENDING)]},
+        {"name": "claim", "keys": [("claimId", ASCENDING)], "sparse": True},
+        # Los correos enviados se eliminan automáticamente tras 7 días
+        {"name": "sent_ttl", "keys": [("sentAt", ASCENDING)], "expireAfterSeconds": 7 * 24 * 3600},
+    ],
+    "receipts": [
+        {"name": "user_status", "keys": [("user", ASCENDING), ("status", ASCENDING)]},
+    ],
+}
+
+
+def _index_options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in spec.items() if key != "keys"}
+
+
+async def _index_usage(collection) -> Dict[str, int]:
+    """Return the number of operations served by each index, if available."""
+    usage = {}
+    try:
+        async for stat in collection.aggregate([{"$indexStats": {}}]):
+            usage[stat["name"]] = stat["accesses"]["ops"]
+    except OperationFailure:
+        # $indexStats no está disponible (p. ej. permisos insuficientes)
+        pass
+    return usage
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every index declared in INDEXES that does not exist yet.
+
+    Returns a report with the indexes that were `created`, the declared
+    indexes that could not be created (`missing`, e.g. duplicated emails
+    blocking the unique index), indexes present in the database but not
+    declared here (`undeclared`) and indexes that have not served any
+    operation since the server started (`unused`). Indexes created in this
+    run are never reported as unused: they have not had a chance yet.
+    """
+    report: Dict[str, List[str]] = {"created": [], "missing": [], "undeclared": [], "unused": []}
+
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        declared = set()
+        created = set()
+
+        for spec in specs:
+            name = spec["name"]
+            declared.add(name)
+            if name in existing:
+                continue
+            try:
+                await collection.create_index(spec["keys"], **_index_options(spec))
+                report["created"].append(f"{collection_name}.{name}")
+                created.add(name)
+            except OperationFailure as e:
+                print(f"No se pudo crear el índice {collection_name}.{name}: {e}")
+                report["missing"].append(f"{collection_name}.{name}")
+
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report["undeclared"].append(f"{collection_name}.{name}")
+
+        usage = await _index_usage(collection)
+        for name, ops in usage.items():
+            if name != "_id_" and name not in created and ops == 0:
+                report["unused"].append(f"{collection_name}.{name}")
+
+    return report
+
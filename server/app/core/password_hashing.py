@@ -0,0 +1,116 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+# Password hashing context. Se define a nivel de módulo para que los procesos
+# del pool puedan usarlo sin necesidad de serializarlo.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool acotado de procesos o hilos para no bloquear
+    el event loop de uvicorn.
+
+    Si hay más operaciones pendientes que `max_pending`, se rechaza la
+    petición con 503 en lugar de encolarla indefinidamente.
+    """
+
+    def __init__(self, executor_type: str = "process", workers: int = 2, max_pending: int = 32):
+        self.executor_type = executor_type
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._operations = 0
+        self._rejected = 0
+        self._errors = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def start(self):
+        """Create the underlying executor."""
+        if self._executor is not None:
+            return
+        if self.executor_type == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        """Shut down the executor, waiting for running operations."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio temporalmente saturado, intenta nuevamente",
+                headers={"Retry-After": "1"},
+            )
+
+        if self._executor is None:
+            self.start()
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._pending -= 1
+            self._operations += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop."""
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash without blocking the event loop."""
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Return hashing latency and saturation metrics."""
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "maxPending": self.max_pending,
+            "pending": self._pending,
+            "operations": self._operations,
+            "rejected": self._rejected,
+            "errors": self._errors,
+            "avgLatencyMs": round(self._total_seconds / self._operations * 1000, 2) if self._operations else 0.0,
+            "maxLatencyMs": round(self._max_seconds * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,43 @@
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+
+# Cantidad de comentarios recientes que se mantienen embebidos en la solicitud
+RECENT_COMMENTS = settings.REQUEST_RECENT_COMMENTS
+
+async def move_embedded_comments(db, request: dict) -> int:
+    """
+    Copy the comments embedded in a request document into the
+    request_comments collection and leave only a counter and the latest
+    RECENT_COMMENTS on the request. Safe to run more than once: comments
+    keep their _id, so already copied ones are skipped.
+
+    Returns the total number of comments of the request.
+    """
+    comments = request.get("comments", [])
+    if comments:
+        operations = [
+            InsertOne({
+                "_id": comment["_id"],
+                "requestId": request["_id"],
+                "userId": comment["userId"],
+                "content": comment["content"],
+                "createdAt": comment["createdAt"],
+            })
+            for comment in comments if comment.get("_id")
+        ]
+        if operations:
+            try:
+                await db.request_comments.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Los duplicados (código 11000) corresponden a comentarios ya copiados
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+
+    total = len(comments)
+    await db.requests.update_one(
+        {"_id": request["_id"], "commentsCount": {"$exists": False}},
+        {"$set": {"commentsCount": total, "comments": comments[-RECENT_COMMENTS:] if RECENT_COMMENTS else []}}
+    )
+    return total
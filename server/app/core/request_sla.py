@@ -0,0 +1,178 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.request import RequestStatus
+
+# Un documento por intervalo cerrado en un estado medido, con _id
+# {requestId, position} (posición en statusHistory de la entrada que abrió
+# el intervalo), su duración en horas, el estado, el administrador que lo
+# cerró y el mes de cierre. Un intervalo cerrado no cambia y statusHistory
+# solo crece, así que cada actualización procesa los intervalos cerrados
+# después de la marca de agua, y reprocesar una ventana reescribe los mismos
+# documentos en lugar de duplicarlos.
+SLA_COLLECTION = "request_sla_intervals"
+SLA_STATE_ID = "state"
+SLA_STATUSES = [RequestStatus.IN_PROCESS, RequestStatus.IN_REVIEW]
+SLA_PERCENTILES = {"p50": 50, "p90": 90, "p99": 99}
+SLA_EPOCH = datetime(1970, 1, 1)
+
+sla_cache = TTLCache(maxsize=32, ttl=settings.SLA_ANALYTICS_CACHE_SECONDS)
+
+def sla_interval_stages(since: datetime, until: datetime) -> List[dict]:
+    """
+    Aggregation stages that pair every statusHistory entry with the next
+    one and emit one document per interval spent in SLA_STATUSES that was
+    closed in (since, until], keyed by (requestId, position).
+    """
+    return [
+        # Respaldado por el índice multikey statusHistory.changedAt
+        {"$match": {"statusHistory": {"$elemMatch": {"changedAt": {"$gt": since, "$lte": until}}}}},
+        {"$project": {"history": "$statusHistory", "entered": "$statusHistory"}},
+        {"$unwind": {"path": "$entered", "includeArrayIndex": "position"}},
+        # La entrada siguiente cierra el intervalo; la última no tiene (intervalo abierto)
+        {"$project": {
+            "position": 1,
+            "entered": 1,
+            "exited": {"$arrayElemAt": ["$history", {"$add": ["$position", 1]}]},
+        }},
+        {"$match": {
+            "entered.toStatus": {"$in": SLA_STATUSES},
+            "exited.changedAt": {"$gt": since, "$lte": until},
+        }},
+        {"$project": {
+            "_id": {"requestId": "$_id", "position": "$position"},
+            "status": "$entered.toStatus",
+            "admin": "$exited.changedBy",
+            "month": {"$dateToString": {"format": "%Y-%m", "date": "$exited.changedAt"}},
+            "hours": {"$divide": [
+                {"$subtract": ["$exited.changedAt", "$entered.changedAt"]}, 3600 * 1000
+            ]},
+        }},
+    ]
+
+def sla_pipeline(since: datetime, until: datetime) -> List[dict]:
+    """sla_interval_stages followed by an idempotent $merge into SLA_COLLECTION."""
+    return sla_interval_stages(since, until) + [
+        {"$merge": {"into": SLA_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+async def _claim_refresh(collection, owner: str, now: datetime) -> Optional[dict]:
+    """
+    Take the refresh lease on the state document (creating it on the first
+    run). Returns the state, or None while another refresh holds the lease.
+    """
+    try:
+        state = await collection.find_one_and_update(
+            {"_id": SLA_STATE_ID, "$or": [{"claimExpiresAt": {"$exists": False}}, {"claimExpiresAt": {"$lt": now}}]},
+            {
+                "$set": {"claimOwner": owner, "claimExpiresAt": now + timedelta(seconds=settings.SLA_REFRESH_LEASE_SECONDS)},
+                "$setOnInsert": {"watermark": SLA_EPOCH},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # El estado existe y otro proceso tiene el lease vigente
+        return None
+    return state if state and state.get("claimOwner") == owner else None
+
+async def refresh_sla(db) -> datetime:
+    """
+    Fold the intervals closed since the last refresh into SLA_COLLECTION
+    and return the current watermark.
+
+    The refresh runs under a lease on the state document, and the watermark
+    only moves after the $merge succeeded: a failed, cancelled or crashed
+    refresh leaves it in place and the next one reprocesses the same window,
+    which the (requestId, position) keys make idempotent.
+    """
+    collection = db[SLA_COLLECTION]
+    now = datetime.utcnow()
+    # changedAt se fija en el servidor de la API antes de que la escritura
+    # se confirme: la marca de agua va atrasada para no saltarse transiciones
+    # selladas antes de `until` pero confirmadas después de la agregación
+    until = now - timedelta(seconds=settings.SLA_WATERMARK_LAG_SECONDS)
+    # BSON guarda milisegundos: la marca devuelta es la misma que se guarda
+    until = until.replace(microsecond=until.microsecond // 1000 * 1000)
+    owner = uuid.uuid4().hex
+
+    state = await _claim_refresh(collection, owner, now)
+    if state is None:
+        state = await collection.find_one({"_id": SLA_STATE_ID})
+        return state["watermark"] if state else SLA_EPOCH
+
+    since = state["watermark"]
+    release = {"$unset": {"claimOwner": "", "claimExpiresAt": ""}}
+    if until <= since:
+        await collection.update_one({"_id": SLA_STATE_ID, "claimOwner": owner}, release)
+        return since
+
+    try:
+        await db.requests.aggregate(sla_pipeline(since, until), allowDiskUse=True).to_list(length=None)
+    except Exception:
+        # La marca de agua no se movió: el próximo intento procesa la misma ventana
+        await collection.update_one({"_id": SLA_STATE_ID, "claimOwner": owner}, release)
+        raise
+
+    # $max: si el lease venció y otro proceso avanzó más, no retroceder
+    await collection.update_one({"_id": SLA_STATE_ID}, {"$max": {"watermark": until}})
+    await collection.update_one({"_id": SLA_STATE_ID, "claimOwner": owner}, release)
+    return until
+
+def percentiles(durations: List[float]) -> dict:
+    """Nearest-rank percentiles of a list of durations."""
+    values = sorted(durations)
+    result = {"count": len(values)}
+    for name, percentile in SLA_PERCENTILES.items():
+        if values:
+            rank = max(1, -(-percentile * len(values) // 100))
+            result[name] = round(values[int(rank) - 1], 2)
+        else:
+            result[name] = None
+    return result
+
+async def sla_report(db, from_month: Optional[str] = None) -> dict:
+    """
+    Percentiles of the time spent in each SLA status, overall, per admin
+    and per month (months >= `from_month`, formatted YYYY-MM).
+    Results are cached for SLA_ANALYTICS_CACHE_SECONDS.
+    """
+    cached = sla_cache.get(from_month)
+    if cached is not None:
+        return cached
+
+    watermark = await refresh_sla(db)
+
+    query: dict = {"status": {"$in": SLA_STATUSES}}
+    if from_month:
+        query["month"] = {"$gte": from_month}
+
+    overall: Dict[str, list] = defaultdict(list)
+    by_admin: Dict[str, Dict] = defaultdict(lambda: defaultdict(list))
+    by_month: Dict[str, Dict] = defaultdict(lambda: defaultdict(list))
+    async for interval in db[SLA_COLLECTION].find(query, {"status": 1, "admin": 1, "month": 1, "hours": 1}):
+        overall[interval["status"]].append(interval["hours"])
+        by_admin[interval["status"]][interval["admin"]].append(interval["hours"])
+        by_month[interval["status"]][interval["month"]].append(interval["hours"])
+
+    report = {
+        "unit": "hours",
+        "computedUntil": watermark,
+        "statuses": {
+            status: {
+                "overall": percentiles(overall[status]),
+                "byAdmin": {admin: percentiles(durations) for admin, durations in by_admin[status].items()},
+                "byMonth": {month: percentiles(durations) for month, durations in sorted(by_month[status].items())},
+            }
+            for status in SLA_STATUSES
+        },
+    }
+    sla_cache.set(from_month, report)
+    return report
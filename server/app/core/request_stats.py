@@ -0,0 +1,140 @@
+from collections import defaultdict
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from app.models.request import RequestStatus
+
+# Contadores materializados de solicitudes. Un documento por ámbito:
+#   "global"         -> todas las solicitudes
+#   "client:<id>"    -> solicitudes de un cliente
+#   "admin:<id>"     -> solicitudes asignadas a un administrador
+# Cada documento guarda count/amount totales y por estado (byStatus.<estado>).
+STATS_COLLECTION = "request_stats"
+GLOBAL_STATS_ID = "global"
+
+def stats_id(scope: str, key=None) -> str:
+    return GLOBAL_STATS_ID if scope == "global" else f"{scope}:{key}"
+
+def _scopes(request: dict):
+    yield "global", None
+    if request.get("clientId"):
+        yield "client", request["clientId"]
+    if request.get("assignedTo"):
+        yield "admin", request["assignedTo"]
+
+def stats_increments(before: Optional[dict], after: Optional[dict]) -> Dict[str, dict]:
+    """
+    Compute the `$inc` documents that move the counters from `before` to
+    `after` (either may be None for creations and deletions). Only the
+    status, clientId, assignedTo and amount fields are read.
+    """
+    increments: Dict[str, dict] = defaultdict(lambda: defaultdict(int))
+    for sign, request in ((-1, before), (1, after)):
+        if request is None:
+            continue
+        amount = request.get("amount") or 0
+        for scope, key in _scopes(request):
+            inc = increments[(scope, key)]
+            inc["count"] += sign
+            inc["amount"] += sign * amount
+            inc[f"byStatus.{request['status']}.count"] += sign
+            inc[f"byStatus.{request['status']}.amount"] += sign * amount
+
+    result = {}
+    for (scope, key), inc in increments.items():
+        inc = {field: value for field, value in inc.items() if value}
+        if inc:
+            result[stats_id(scope, key)] = {"scope": scope, "key": key, "inc": inc}
+    return result
+
+async def record_request_change(db, before: Optional[dict], after: Optional[dict]) -> None:
+    """
+    Apply the counter changes for one request write. Call it after the
+    write on `requests` succeeded. Errors are logged and not raised: the
+    request was already saved, and `rebuild_request_stats` can fix drift.
+    """
+    await record_request_changes(db, [(before, after)])
+
+async def record_request_changes(db, changes) -> None:
+    """Apply the counter changes of several request writes in one bulk_write."""
+    merged: Dict[str, dict] = {}
+    for before, after in changes:
+        for doc_id, delta in stats_increments(before, after).items():
+            if doc_id not in merged:
+                merged[doc_id] = delta
+                continue
+            inc = merged[doc_id]["inc"]
+            for field, value in delta["inc"].items():
+                inc[field] = inc.get(field, 0) + value
+
+    operations = [
+        UpdateOne(
+            {"_id": doc_id},
+            {"$inc": delta["inc"], "$setOnInsert": {"scope": delta["scope"], "key": delta["key"]}},
+            upsert=True
+        )
+        for doc_id, delta in merged.items() if any(delta["inc"].values())
+    ]
+    if not operations:
+        return
+    try:
+        await db[STATS_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"Error al actualizar las estadísticas de solicitudes: {e}")
+
+async def rebuild_request_stats(db) -> int:
+    """
+    Recompute every counter from the requests collection. The new counters
+    are written to a temporary collection and swapped in with a rename, so
+    readers never see a partially rebuilt state.
+
+    Returns the number of stats documents written.
+    """
+    totals: Dict[str, dict] = {}
+
+    def add(scope, key, status, count, amount):
+        doc_id = stats_id(scope, key)
+        doc = totals.setdefault(doc_id, {"_id": doc_id, "scope": scope, "key": key, "count": 0, "amount": 0, "byStatus": {}})
+        doc["count"] += count
+        doc["amount"] += amount
+        by_status = doc["byStatus"].setdefault(status, {"count": 0, "amount": 0})
+        by_status["count"] += count
+        by_status["amount"] += amount
+
+    pipeline = [{"$group": {
+        "_id": {"status": "$status", "clientId": "$clientId", "assignedTo": "$assignedTo"},
+        "count": {"$sum": 1},
+        "amount": {"$sum": {"$ifNull": ["$amount", 0]}},
+    }}]
+    async for group in db.requests.aggregate(pipeline, allowDiskUse=True):
+        request = group["_id"]
+        for scope, key in _scopes(request):
+            add(scope, key, request["status"], group["count"], group["amount"])
+
+    if GLOBAL_STATS_ID not in totals:
+        totals[GLOBAL_STATS_ID] = {"_id": GLOBAL_STATS_ID, "scope": "global", "key": None, "count": 0, "amount": 0, "byStatus": {}}
+
+    staging = db[f"{STATS_COLLECTION}_rebuild"]
+    await staging.drop()
+    await staging.insert_many(list(totals.values()))
+    await staging.rename(STATS_COLLECTION, dropTarget=True)
+    return len(totals)
+
+def stats_summary(doc: Optional[dict]) -> dict:
+    """Public payload of a stats document, with every status present."""
+    doc = doc or {}
+    by_status = doc.get("byStatus", {})
+    labels = RequestStatus.status_labels()
+    return {
+        "count": int(doc.get("count", 0)),
+        "amount": round(doc.get("amount", 0), 2),
+        "byStatus": {
+            status: {
+                "label": labels.get(status, status),
+                "count": int(by_status.get(status, {}).get("count", 0)),
+                "amount": round(by_status.get(status, {}).get("amount", 0), 2),
+            }
+            for status in RequestStatus.all_statuses()
+        },
+    }
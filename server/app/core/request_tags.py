@@ -0,0 +1,81 @@
+import re
+from typing import Iterable, List, Optional
+
+from pymongo import DESCENDING, UpdateOne
+
+# Conteo precalculado de solicitudes por etiqueta: {_id: etiqueta,
+# normalized: etiqueta en minúsculas, count}. Evita un distinct sobre
+# todas las solicitudes para listar y autocompletar etiquetas.
+TAGS_COLLECTION = "request_tags"
+
+def _tag_set(tags: Optional[Iterable[str]]) -> set:
+    return {tag for tag in (tags or []) if tag}
+
+async def record_tag_change(
+    db,
+    before: Optional[Iterable[str]],
+    after: Optional[Iterable[str]]
+) -> None:
+    """
+    Update the tag counters after a request's tags changed from `before`
+    to `after` (None for creations and deletions). Errors are logged and
+    not raised; `rebuild_request_tags` fixes any drift.
+    """
+    old_tags, new_tags = _tag_set(before), _tag_set(after)
+    changes = {tag: 1 for tag in new_tags - old_tags}
+    changes.update({tag: -1 for tag in old_tags - new_tags})
+    if not changes:
+        return
+
+    operations = [
+        UpdateOne(
+            {"_id": tag},
+            {"$inc": {"count": change}, "$setOnInsert": {"normalized": tag.lower()}},
+            upsert=True
+        )
+        for tag, change in changes.items()
+    ]
+    try:
+        await db[TAGS_COLLECTION].bulk_write(operations, ordered=False)
+        if any(change < 0 for change in changes.values()):
+            await db[TAGS_COLLECTION].delete_many({"_id": {"$in": list(old_tags - new_tags)}, "count": {"$lte": 0}})
+    except Exception as e:
+        print(f"Error al actualizar el conteo de etiquetas: {e}")
+
+async def search_tags(db, prefix: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """
+    Tags in use starting with `prefix` (case insensitive), most used first.
+    The anchored regex on `normalized` is served by its index.
+    """
+    query = {"count": {"$gt": 0}}
+    if prefix:
+        query["normalized"] = {"$regex": f"^{re.escape(prefix.lower())}"}
+    cursor = db[TAGS_COLLECTION].find(query).sort([("count", DESCENDING), ("_id", 1)]).limit(limit)
+    return [{"tag": tag["_id"], "count": tag["count"]} async for tag in cursor]
+
+async def rebuild_request_tags(db) -> int:
+    """
+    Recompute the tag counters from the requests collection with one
+    aggregation into a staging collection, then swap it in with a rename.
+    Returns the number of distinct tags.
+    """
+    staging = f"{TAGS_COLLECTION}_rebuild"
+    await db[staging].drop()
+    await db.requests.aggregate([
+        {"$match": {"tags.0": {"$exists": True}}},
+        # $setUnion elimina etiquetas repetidas dentro de una misma solicitud
+        {"$project": {"tags": {"$setUnion": ["$tags", []]}}},
+        {"$unwind": "$tags"},
+        {"$match": {"tags": {"$nin": [None, ""]}}},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        {"$set": {"normalized": {"$toLower": "$_id"}}},
+        {"$out": staging},
+    ], allowDiskUse=True).to_list(length=None)
+
+    total = await db[staging].count_documents({})
+    if total:
+        await db[staging].create_index("normalized", name="normalized")
+        await db[staging].rename(TAGS_COLLECTION, dropTarget=True)
+    else:
+        await db[TAGS_COLLECTION].delete_many({})
+    return total
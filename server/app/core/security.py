@@ -1,11 +1,19 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.models.user import UserRole
+from app.core.password_hashing import pwd_context, password_hasher
+from app.core.cache import TTLCache
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Caché de tokens ya verificados: sha256(token) -> claims decodificados.
+# Cada entrada expira junto con el `exp` del token.
+verified_token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
@@ -15,17 +23,65 @@ def get_password_hash(password: str) -> str:
     """Hash a password for storing."""
     return pwd_context.hash(password)
 
-def create_access_token(subject: Any, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a JWT access token."""
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash in the password hashing pool."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password for storing in the password hashing pool."""
+    return await password_hasher.hash(password)
+
+def create_access_token(
+    subject: Any,
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[Dict[str, Any]] = None
+) -> str:
+    """Create a JWT access token, optionally carrying extra claims."""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode = {"exp": expire, "sub": str(subject)}
+    if claims:
+        to_encode.update(claims)
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+def create_user_access_token(user: Dict[str, Any]) -> str:
+    """
+    Create an access token for a user document. In stateless principal mode
+    the token also carries role, profile and token version claims.
+    """
+    if not settings.STATELESS_PRINCIPAL:
+        return create_access_token(user["_id"])
+    
+    claims = {
+        "role": user.get("role", UserRole.CLIENT),
+        "firstName": user["firstName"],
+        "lastName": user["lastName"],
+        "email": user["email"],
+        "createdAt": user["createdAt"].isoformat(),
+        "ver": user.get("tokenVersion", 0),
+    }
+    return create_access_token(user["_id"], claims=claims)
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Decode and verify an access token, reusing the result for tokens that
+    were already verified. Raises JWTError if the token is invalid.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(digest)
+    if payload is not None:
+        return payload
+    
+    payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None:
+        verified_token_cache.set(digest, payload, ttl=exp - time.time())
+    return payload
+
 def create_reset_token(email: str) -> str:
     """Create a password reset token."""
     expire = datetime.utcnow() + timedelta(minutes=30)  # 30 minutes validity
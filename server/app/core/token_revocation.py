@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.database import get_database
+
+
+class TokenVersionTable:
+    """
+    Tabla en memoria user_id -> tokenVersion usada para revocar tokens
+    sin estado.
+
+    Solo se cargan los usuarios con `tokenVersion` > 0 (los que alguna vez
+    revocaron sus tokens), y la tabla se refresca periódicamente desde Mongo
+    para que todas las instancias de la API converjan.
+    """
+
+    def __init__(self, refresh_seconds: int = 30):
+        self.refresh_seconds = refresh_seconds
+        self._versions: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    def current_version(self, user_id: Any) -> int:
+        return self._versions.get(str(user_id), 0)
+
+    def is_revoked(self, user_id: Any, token_version: int) -> bool:
+        """Return True if the token was issued before the user's last revocation."""
+        return token_version < self.current_version(user_id)
+
+    async def refresh(self):
+        """Reload the table from the users collection."""
+        db = get_database()
+        versions = {}
+        cursor = db.users.find({"tokenVersion": {"$gt": 0}}, {"tokenVersion": 1})
+        async for user in cursor:
+            versions[str(user["_id"])] = user["tokenVersion"]
+        self._versions = versions
+        self.refreshes += 1
+
+    async def bump(self, user_id: Any) -> int:
+        """Revoke every token issued so far for a user and return the new version."""
+        db = get_database()
+        user = await db.users.find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {"tokenVersion": 1}},
+            projection={"tokenVersion": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        version = user["tokenVersion"] if user else 0
+        self._versions[str(user_id)] = version
+        return version
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refrescando versiones de token: {e}")
+
+    async def start(self):
+        """Load the table and start the periodic refresh task."""
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the periodic refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "trackedUsers": len(self._versions),
+            "refreshes": self.refreshes,
+            "refreshSeconds": self.refresh_seconds,
+        }
+
+
+token_versions = TokenVersionTable(refresh_seconds=settings.TOKEN_VERSION_REFRESH_SECONDS)
@@ -3,14 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
-from app.api.routes import auth, receipts, requests
+from app.api.routes import auth, receipts, requests, metrics
+from app.api.routes import email_outbox as email_outbox_routes
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.password_hashing import password_hasher
+from app.core.token_revocation import token_versions
+from app.core.email_queue import email_outbox
+from app.core.email_service import smtp_pool
+from app.core.due_reminders import due_date_reminders
+from app.api.responses import MongoJSONResponse
+from app.api.request_events import request_events
 
 app = FastAPI(
     title="MisViaticos API",
     description="API para gestión de boletas de gastos",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=MongoJSONResponse
 )
 
 # CORS configuration
@@ -26,6 +35,8 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(receipts.router, prefix="/api/receipts", tags=["Receipts"])
 app.include_router(requests.router, prefix="/api/requests", tags=["Requests"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(email_outbox_routes.router, prefix="/api/email-outbox", tags=["Email outbox"])
 
 # Mount static files for uploads
 os.makedirs("uploads", exist_ok=True)
@@ -35,9 +46,22 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    password_hasher.start()
+    email_outbox.start()
+    request_events.start()
+    if settings.DUE_REMINDERS_ENABLED:
+        due_date_reminders.start()
+    if settings.STATELESS_PRINCIPAL:
+        await token_versions.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await request_events.stop()
+    await due_date_reminders.stop()
+    await email_outbox.stop()
+    smtp_pool.close_all()
+    await token_versions.stop()
+    password_hasher.shutdown()
     await close_mongo_connection()
 
 @app.get("/", tags=["Health"])
@@ -0,0 +1,14 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+# Modelo para reencolar correos en estado dead
+class OutboxRequeueRequest(BaseModel):
+    ids: Optional[List[str]] = None  # Si no se indica, se reencolan todos
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "ids": ["507f1f77bcf86cd799439011"]
+            }
+        }
+    }
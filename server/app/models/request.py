@@ -25,6 +25,30 @@ class RequestStatus:
             cls.APPROVED: "Aprobado",
             cls.REJECTED: "Rechazado"
         }
+    
+    @classmethod
+    def transitions(cls):
+        """Transiciones permitidas a los administradores: origen -> destinos"""
+        return {
+            cls.DRAFT: [cls.IN_PROCESS],
+            cls.IN_PROCESS: [cls.IN_REVIEW, cls.APPROVED, cls.REJECTED, cls.DRAFT],
+            cls.IN_REVIEW: [cls.IN_PROCESS, cls.APPROVED, cls.REJECTED, cls.DRAFT],
+            cls.APPROVED: [cls.IN_REVIEW],
+            cls.REJECTED: [cls.IN_REVIEW, cls.DRAFT]
+        }
+    
+    @classmethod
+    def client_transitions(cls):
+        """Transiciones permitidas a los clientes: solo enviar un borrador"""
+        return {
+            cls.DRAFT: [cls.IN_PROCESS]
+        }
+    
+    @classmethod
+    def allowed_from(cls, to_status, transitions=None):
+        """Estados desde los que se puede pasar a `to_status`"""
+        transitions = transitions if transitions is not None else cls.transitions()
+        return [from_status for from_status, targets in transitions.items() if to_status in targets]
 
 # Modelo para comentarios en una solicitud
 class RequestComment(BaseModel):
@@ -142,12 +166,15 @@ class RequestUpdate(BaseModel):
     amount: Optional[float] = None
     dueDate: Optional[datetime] = None
     tags: Optional[List[str]] = None
+    # Versión leída por el cliente (alternativa a la cabecera If-Match)
+    version: Optional[int] = Field(None, ge=0)
     
     model_config = {
         "json_schema_extra": {
             "example": {
                 "title": "Solicitud actualizada",
-                "status": "in_review"
+                "status": "in_review",
+                "version": 3
             }
         }
     }
@@ -166,6 +193,23 @@ class StatusChangeRequest(BaseModel):
         }
     }
 
+# Modelo para cambios masivos de estado o asignación (solo administradores)
+class BulkRequestUpdate(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500)
+    status: Optional[str] = None
+    reason: Optional[str] = None
+    assignedTo: Optional[str] = None
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "ids": ["507f1f77bcf86cd799439011", "507f1f77bcf86cd799439012"],
+                "status": "approved",
+                "reason": "Aprobación masiva de fin de mes"
+            }
+        }
+    }
+
 # Modelo para añadir un comentario
 class CommentCreate(BaseModel):
     content: str
@@ -0,0 +1,91 @@
+from html import escape
+
+
+def get_due_date_reminder_template(user_name, requests, requests_url):
+    """
+    Genera la plantilla del recordatorio de solicitudes próximas a vencer.
+    
+    Args:
+        user_name (str): Nombre del destinatario
+        requests (list): Solicitudes, cada una con title, statusLabel y dueDate (datetime)
+        requests_url (str): URL del listado de solicitudes
+        
+    Returns:
+        tuple: (html_content, text_content)
+    """
+    
+    rows_html = "".join(
+        f"""
+                    <tr>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee;">{escape(request["title"])}</td>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee;">{escape(request["statusLabel"])}</td>
+                        <td style="padding: 8px; border-bottom: 1px solid #eee;">{request["dueDate"].strftime("%d-%m-%Y %H:%M")} UTC</td>
+                    </tr>"""
+        for request in requests
+    )
+    rows_text = "\n".join(
+        f"    - {request['title']} ({request['statusLabel']}), vence el {request['dueDate'].strftime('%d-%m-%Y %H:%M')} UTC"
+        for request in requests
+    )
+    
+    # Versión HTML
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Solicitudes por vencer - EncoderGroup</title>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    </head>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; margin: 0; padding: 0;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #eee; border-radius: 5px;">
+            <div style="text-align: center; margin-bottom: 20px;">
+                <img src="https://i.imgur.com/VZF6Wzt.png" alt="EncoderGroup Logo" style="max-width: 150px;">
+                <h1 style="color: #4F46E5; margin-top: 10px;">Solicitudes por vencer</h1>
+            </div>
+            
+            <div style="margin-bottom: 30px;">
+                <p>Hola {escape(user_name)},</p>
+                <p>Las siguientes solicitudes vencen pronto y siguen pendientes:</p>
+                
+                <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
+                    <tr>
+                        <th style="padding: 8px; text-align: left; border-bottom: 2px solid #4F46E5;">Solicitud</th>
+                        <th style="padding: 8px; text-align: left; border-bottom: 2px solid #4F46E5;">Estado</th>
+                        <th style="padding: 8px; text-align: left; border-bottom: 2px solid #4F46E5;">Vencimiento</th>
+                    </tr>{rows_html}
+                </table>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="{requests_url}" style="display: inline-block; background-color: #4F46E5; color: white; font-weight: bold; padding: 12px 24px; text-decoration: none; border-radius: 4px;">
+                        Ver mis solicitudes
+                    </a>
+                </div>
+            </div>
+            
+            <div style="margin-top: 40px; padding-top: 20px; border-top: 1px solid #eee; text-align: center; color: #777; font-size: 12px;">
+                <p>&copy; 2025 EncoderGroup. Todos los derechos reservados.</p>
+                <p>Si tienes alguna pregunta, contáctanos en <a href="mailto:soporte@encodergroup.com" style="color: #4F46E5;">soporte@encodergroup.com</a></p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Versión de texto plano
+    text_content = f"""
+    Solicitudes por vencer - EncoderGroup
+    
+    Hola {user_name},
+    
+    Las siguientes solicitudes vencen pronto y siguen pendientes:
+    
+{rows_text}
+    
+    Puedes revisarlas en: {requests_url}
+    
+    --
+    © 2025 EncoderGroup. Todos los derechos reservados.
+    """
+    
+    return (html_content, text_content)
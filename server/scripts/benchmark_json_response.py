@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de una página de 100 solicitudes.
+
+Compara el camino anterior de GET /api/requests (armar un dict por
+solicitud con ObjectId convertidos a str, validar y serializar con
+response_model=dict y renderizar con json de la biblioteca estándar) con
+el actual (documentos de Mongo completados en el lugar y renderizados con
+MongoJSONResponse / orjson).
+
+Uso:
+    python scripts/benchmark_json_response.py [iteraciones]
+"""
+
+import sys
+import os
+import copy
+import random
+import timeit
+from datetime import datetime, timedelta
+
+# Agregar directorio parent al path para importar módulos del proyecto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from fastapi._compat import ModelField
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic.fields import FieldInfo
+from app.api.responses import MongoJSONResponse
+from app.models.request import RequestStatus
+
+PAGE_SIZE = 100
+
+
+def _page():
+    """A page of documents as returned by the list aggregation."""
+    now = datetime.utcnow()
+    page = []
+    for i in range(PAGE_SIZE):
+        page.append({
+            "_id": ObjectId(),
+            "title": f"Reembolso de viáticos {i}",
+            "description": "Viaje a Santiago para reunión con cliente, incluye hotel y pasajes " * 3,
+            "status": random.choice(RequestStatus.all_statuses()),
+            "clientId": ObjectId(),
+            "assignedTo": ObjectId() if i % 2 else None,
+            "amount": round(random.uniform(1000, 500000), 2),
+            "dueDate": now + timedelta(days=i),
+            "tags": ["viáticos", "reembolso", "viaje"],
+            "commentsCount": i % 7,
+            "filesCount": i % 3,
+            "createdAt": now - timedelta(hours=i),
+            "updatedAt": now,
+        })
+    return page
+
+
+def _user(user_id):
+    return {"id": str(user_id), "firstName": "Ana", "lastName": "Pérez", "email": "ana@example.com", "role": "client"}
+
+
+def before(page, field):
+    requests_list = []
+    for request in page:
+        requests_list.append({
+            "id": str(request["_id"]),
+            "title": request["title"],
+            "description": request["description"],
+            "status": request["status"],
+            "statusLabel": RequestStatus.status_labels().get(request["status"], request["status"]),
+            "clientId": str(request["clientId"]),
+            "client": _user(request["clientId"]),
+            "assignedTo": str(request["assignedTo"]) if request.get("assignedTo") else None,
+            "assignedAdmin": _user(request["assignedTo"]) if request.get("assignedTo") else None,
+            "amount": request.get("amount"),
+            "dueDate": request.get("dueDate"),
+            "tags": request.get("tags", []),
+            "commentsCount": request["commentsCount"],
+            "filesCount": request["filesCount"],
+            "createdAt": request["createdAt"],
+            "updatedAt": request.get("updatedAt"),
+        })
+    content = {"success": True, "total": 1000, "requests": requests_list}
+    # Lo que hace FastAPI con response_model=dict antes de renderizar
+    value, _ = field.validate(content, {}, loc=("response",))
+    return JSONResponse(field.serialize(value)).body
+
+
+def after(page):
+    status_labels = RequestStatus.status_labels()
+    for request in page:
+        request["id"] = request.pop("_id")
+        request["statusLabel"] = status_labels.get(request["status"], request["status"])
+        request["client"] = _user(request["clientId"])
+        request["assignedAdmin"] = _user(request["assignedTo"]) if request["assignedTo"] else None
+    return MongoJSONResponse({"success": True, "total": 1000, "requests": page}).body
+
+
+def main(iterations: int):
+    field = ModelField(name="Response_get_requests", field_info=FieldInfo(annotation=dict), mode="serialization")
+    template = _page()
+    # Copias preparadas fuera del tiempo medido: after() modifica los documentos
+    pages = [copy.deepcopy(template) for _ in range(iterations)]
+
+    before_seconds = timeit.timeit(lambda: before(template, field), number=iterations)
+    pages_iter = iter(pages)
+    after_seconds = timeit.timeit(lambda: after(next(pages_iter)), number=iterations)
+
+    print(f"Página de {PAGE_SIZE} solicitudes, {iterations} iteraciones:")
+    print(f"  antes (dict + response_model + json):   {before_seconds / iterations * 1000:7.3f} ms/página")
+    print(f"  ahora (documentos en el lugar + orjson): {after_seconds / iterations * 1000:7.3f} ms/página")
+    print(f"  mejora: {before_seconds / after_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda de solicitudes: $regex sin índice vs índice de texto.
+
+Genera un conjunto sintético de solicitudes en español en una base de datos
+de pruebas (por defecto 1.000.000 de documentos), crea el índice de texto
+declarado en app/core/indexes.py y compara ambas búsquedas con las mismas
+consultas que usa GET /api/requests.
+
+Uso:
+    MONGO_URI=mongodb://localhost:27017/benchmark python scripts/benchmark_request_search.py [documentos]
+
+ADVERTENCIA: la colección `requests` de la base de datos indicada se elimina.
+"""
+
+import sys
+import os
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+# Agregar directorio parent al path para importar módulos del proyecto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.indexes import INDEXES
+from app.models.request import RequestStatus
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/benchmark")
+BATCH_SIZE = 10000
+QUERIES = ["reembolso", "viaje", "hotel santiago", "capacitación", "compra de equipos"]
+
+WORDS = [
+    "reembolso", "viáticos", "viaje", "hotel", "pasajes", "aéreos", "reunión", "cliente",
+    "santiago", "valparaíso", "concepción", "capacitación", "curso", "compra", "equipos",
+    "computadores", "licencias", "software", "alimentación", "transporte", "taxi", "peajes",
+    "combustible", "arriendo", "vehículo", "oficina", "materiales", "proyecto", "soporte",
+    "mantención", "servidores", "conferencia", "seminario", "gastos", "representación",
+]
+TAGS = ["viáticos", "reembolso", "viaje", "compras", "capacitación", "soporte", "urgente"]
+
+
+def _sentence(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _document(clients, now):
+    return {
+        "title": _sentence(random.randint(3, 7)),
+        "description": _sentence(random.randint(15, 40)),
+        "status": random.choice(RequestStatus.all_statuses()),
+        "clientId": random.choice(clients),
+        "amount": round(random.uniform(1000, 500000), 2),
+        "tags": random.sample(TAGS, random.randint(0, 3)),
+        "comments": [],
+        "files": [],
+        "statusHistory": [],
+        "createdAt": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+        "updatedAt": None,
+    }
+
+
+async def populate(db, total: int):
+    await db.requests.drop()
+    clients = [ObjectId() for _ in range(1000)]
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    for offset in range(0, total, BATCH_SIZE):
+        batch = [_document(clients, now) for _ in range(min(BATCH_SIZE, total - offset))]
+        await db.requests.insert_many(batch, ordered=False)
+    print(f"Insertados {total} documentos en {time.perf_counter() - started:.1f}s")
+
+    for spec in INDEXES["requests"]:
+        options = {key: value for key, value in spec.items() if key != "keys"}
+        await db.requests.create_index(spec["keys"], **options)
+    print("Índices creados")
+
+
+async def _timed(db, query: dict, sort, limit: int = 10):
+    started = time.perf_counter()
+    await db.requests.find(query).sort(sort).limit(limit).to_list(length=limit)
+    total = await db.requests.count_documents(query)
+    elapsed = time.perf_counter() - started
+    explain = await db.command(
+        "explain", {"find": "requests", "filter": query, "sort": dict(sort), "limit": limit},
+        verbosity="executionStats",
+    )
+    examined = explain["executionStats"]["totalDocsExamined"]
+    return elapsed, total, examined
+
+
+async def run(total: int):
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[MONGO_URI.rsplit("/", 1)[-1] or "benchmark"]
+    try:
+        if await db.requests.estimated_document_count() != total:
+            await populate(db, total)
+
+        for search in QUERIES:
+            regex_query = {"$or": [
+                {"title": {"$regex": search, "$options": "i"}},
+                {"description": {"$regex": search, "$options": "i"}},
+            ]}
+            text_query = {"$text": {"$search": search, "$language": "spanish"}}
+
+            regex_time, regex_total, regex_examined = await _timed(
+                db, regex_query, [("createdAt", -1), ("_id", -1)]
+            )
+            text_time, text_total, text_examined = await _timed(
+                db, text_query, [("score", {"$meta": "textScore"}), ("createdAt", -1)]
+            )
+            print(f"'{search}':")
+            print(f"  regex: {regex_time * 1000:8.1f} ms, {regex_total} resultados, {regex_examined} docs examinados")
+            print(f"  text:  {text_time * 1000:8.1f} ms, {text_total} resultados, {text_examined} docs examinados")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
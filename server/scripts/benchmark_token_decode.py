@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark de decodificación de tokens JWT con y sin la caché de tokens verificados.
+
+Simula un número fijo de peticiones autenticadas repartidas entre un conjunto
+de usuarios activos y mide el tiempo de CPU por petición en ambos casos.
+
+Uso:
+    python scripts/benchmark_token_decode.py [peticiones] [usuarios]
+"""
+
+import sys
+import os
+import time
+
+# Agregar directorio parent al path para importar módulos del proyecto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from jose import jwt
+from app.core.config import settings
+from app.core.security import create_access_token, decode_access_token, verified_token_cache
+
+def run(requests: int, users: int):
+    tokens = [create_access_token(ObjectId()) for _ in range(users)]
+
+    # Sin caché: jose.jwt.decode en cada petición
+    started = time.process_time()
+    for i in range(requests):
+        jwt.decode(tokens[i % users], settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    uncached = time.process_time() - started
+
+    # Con caché: solo la primera petición de cada token se verifica
+    verified_token_cache.clear()
+    started = time.process_time()
+    for i in range(requests):
+        decode_access_token(tokens[i % users])
+    cached = time.process_time() - started
+
+    print(f"Peticiones: {requests}, usuarios activos: {users}")
+    print(f"Sin caché: {uncached * 1e6 / requests:.1f} µs CPU/petición")
+    print(f"Con caché: {cached * 1e6 / requests:.1f} µs CPU/petición")
+    print(f"Ahorro:    {(uncached - cached) * 1e6 / requests:.1f} µs CPU/petición "
+          f"({uncached / cached:.1f}x)")
+    print(f"Caché: {verified_token_cache.stats()}")
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    run(requests, users)
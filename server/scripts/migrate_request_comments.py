@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script de migración para mover los comentarios embebidos de las solicitudes
+a la colección `request_comments`.
+
+Cada solicitud queda con el contador `commentsCount` y solo los comentarios
+más recientes embebidos. Puede ejecutarse varias veces sin duplicar datos.
+"""
+
+import sys
+import os
+import asyncio
+
+# Agregar directorio parent al path para importar módulos del proyecto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Importar módulos del proyecto
+from app.core.database import get_database, connect_to_mongo, close_mongo_connection
+from app.core.config import settings
+from app.core.request_comments import move_embedded_comments
+
+async def migrate_request_comments():
+    """
+    Mueve los comentarios de todas las solicitudes que aún no tienen
+    el contador commentsCount.
+    """
+    print("Iniciando migración de comentarios de solicitudes...")
+    
+    try:
+        await connect_to_mongo()
+        db = get_database()
+        
+        if db is None:
+            raise Exception("No se pudo conectar a la base de datos. Verifica la configuración de MongoDB.")
+        
+        pending_query = {"commentsCount": {"$exists": False}}
+        pending = await db.requests.count_documents(pending_query)
+        print(f"Solicitudes por migrar: {pending}")
+        
+        if pending == 0:
+            print("No hay solicitudes que necesiten migración.")
+            return
+        
+        migrated = 0
+        moved = 0
+        cursor = db.requests.find(pending_query, {"comments": 1})
+        async for request in cursor:
+            moved += await move_embedded_comments(db, request)
+            migrated += 1
+            if migrated % 500 == 0:
+                print(f"- {migrated}/{pending} solicitudes migradas")
+        
+        print(f"Migración completada exitosamente:")
+        print(f"- Solicitudes migradas: {migrated}")
+        print(f"- Comentarios movidos: {moved}")
+        
+    except Exception as e:
+        print(f"Error durante la migración: {str(e)}")
+        raise e
+
+async def main():
+    try:
+        print(f"Conectando a la base de datos MongoDB en: {settings.MONGO_URI}")
+        await migrate_request_comments()
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular desde cero los contadores materializados de
+solicitudes (colecciones `request_stats` y `request_tags`).
+
+Ejecutarlo una vez al desplegar los contadores sobre una base de datos con
+solicitudes existentes, y cada vez que se sospeche que se desincronizaron.
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Agregar directorio parent al path para importar módulos del proyecto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Importar módulos del proyecto
+from app.core.database import get_database, connect_to_mongo, close_mongo_connection
+from app.core.config import settings
+from app.core.request_stats import rebuild_request_stats
+from app.core.request_tags import rebuild_request_tags
+
+async def rebuild():
+    print("Recalculando estadísticas de solicitudes...")
+    
+    try:
+        await connect_to_mongo()
+        db = get_database()
+        
+        if db is None:
+            raise Exception("No se pudo conectar a la base de datos. Verifica la configuración de MongoDB.")
+        
+        started = time.perf_counter()
+        written = await rebuild_request_stats(db)
+        print(f"Estadísticas recalculadas en {time.perf_counter() - started:.1f}s")
+        print(f"- Documentos de estadísticas: {written}")
+        
+        started = time.perf_counter()
+        tags = await rebuild_request_tags(db)
+        print(f"Conteo de etiquetas recalculado en {time.perf_counter() - started:.1f}s")
+        print(f"- Etiquetas distintas: {tags}")
+        
+    except Exception as e:
+        print(f"Error al recalcular las estadísticas: {str(e)}")
+        raise e
+
+async def main():
+    try:
+        print(f"Conectando a la base de datos MongoDB en: {settings.MONGO_URI}")
+        await rebuild()
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import app.core.database as database
+from app.api import deps
+from app.main import app
+from app.models.user import UserPublic
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mock_db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(database, "db", mock_db)
+    return mock_db
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion (seeding and assertions on the mock database)."""
+    return asyncio.run
+
+
+@pytest.fixture
+def client():
+    """
+    TestClient authenticated as the user given to `client.login(user)`.
+    Used without `with`, so the app startup (MongoDB connection and
+    background tasks) does not run.
+    """
+    test_client = TestClient(app)
+    current = {}
+
+    def login(user):
+        current["user"] = UserPublic(
+            id=str(user["_id"]), firstName=user["firstName"], lastName=user["lastName"],
+            email=user["email"], role=user["role"], createdAt=user["createdAt"],
+        )
+
+    test_client.login = login
+    app.dependency_overrides[deps.get_current_user] = lambda: current["user"]
+    yield test_client
+    app.dependency_overrides.pop(deps.get_current_user, None)
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.models.request import RequestStatus
+
+
+def make_user(role, **fields):
+    return {
+        "_id": ObjectId(),
+        "firstName": "Nombre",
+        "lastName": role,
+        "email": f"{ObjectId()}@example.com",
+        "role": role,
+        "createdAt": datetime.utcnow(),
+        **fields,
+    }
+
+
+def make_request(client_id, **fields):
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "title": "Solicitud",
+        "description": "Descripción",
+        "amount": 100,
+        "status": RequestStatus.IN_PROCESS,
+        "clientId": client_id,
+        "tags": [],
+        "comments": [],
+        "statusHistory": [],
+        "files": [],
+        "version": 0,
+        "createdAt": now,
+        "updatedAt": now,
+        **fields,
+    }
@@ -0,0 +1,40 @@
+from app.models.user import UserRole
+from tests.factories import make_request, make_user
+
+
+def test_bulk_update_normalizes_id_case(db, run, client):
+    admin = make_user(UserRole.ADMIN)
+    owner = make_user(UserRole.CLIENT)
+    first = make_request(owner["_id"])
+    second = make_request(owner["_id"])
+
+    async def seed():
+        await db.users.insert_many([admin, owner])
+        await db.requests.insert_many([first, second])
+
+    run(seed())
+    first_id, second_id = str(first["_id"]), str(second["_id"])
+
+    client.login(admin)
+    response = client.post("/api/requests/bulk", json={
+        "ids": [first_id.upper(), first_id, second_id.upper(), "no-es-un-id"],
+        "assignedTo": str(admin["_id"]),
+    })
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["matched"] == 2
+    assert body["results"] == [
+        {"id": first_id.upper(), "success": True},
+        {"id": first_id, "success": True},
+        {"id": second_id.upper(), "success": True},
+        {"id": "no-es-un-id", "success": False, "error": "ID de solicitud inválido"},
+    ]
+
+    async def stored():
+        return await db.requests.find({}, {"assignedTo": 1, "version": 1, "bulkUpdateId": 1}).to_list(None)
+
+    for request in run(stored()):
+        assert request["assignedTo"] == admin["_id"]
+        assert request["version"] == 1
+        assert "bulkUpdateId" not in request
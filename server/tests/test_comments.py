@@ -0,0 +1,63 @@
+import pytest
+
+from app.models.user import UserRole
+from tests.factories import make_request, make_user
+
+
+@pytest.fixture
+def seeded(db, run):
+    owner = make_user(UserRole.CLIENT)
+    request = make_request(owner["_id"], commentsCount=0)
+
+    async def seed():
+        await db.users.insert_one(owner)
+        await db.requests.insert_one(request)
+
+    run(seed())
+    return owner, request
+
+
+def test_add_comment_updates_request_and_collection(db, run, client, seeded):
+    owner, request = seeded
+    client.login(owner)
+
+    response = client.post(f"/api/requests/{request['_id']}/comments", json={"content": "Hola"})
+
+    assert response.status_code == 200, response.text
+    stored = run(db.requests.find_one({"_id": request["_id"]}))
+    assert stored["commentsCount"] == 1
+    assert [comment["content"] for comment in stored["comments"]] == ["Hola"]
+    assert run(db.request_comments.count_documents({"requestId": request["_id"]})) == 1
+
+
+def test_add_comment_to_a_request_deleted_meanwhile_stores_nothing(db, run, client, seeded, monkeypatch):
+    owner, request = seeded
+    client.login(owner)
+    update_one = type(db.requests).update_one
+
+    async def delete_then_update(self, *args, **kwargs):
+        # La solicitud se elimina entre la lectura y la escritura
+        await self.delete_one({"_id": request["_id"]})
+        return await update_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.requests), "update_one", delete_then_update)
+    response = client.post(f"/api/requests/{request['_id']}/comments", json={"content": "Hola"})
+
+    assert response.status_code == 404
+    assert run(db.request_comments.count_documents({})) == 0
+
+
+def test_add_comment_rolls_back_the_request_when_the_insert_fails(db, run, client, seeded, monkeypatch):
+    owner, request = seeded
+    client.login(owner)
+
+    async def failing_insert(*args, **kwargs):
+        raise RuntimeError("fallo de escritura")
+
+    monkeypatch.setattr(type(db.request_comments), "insert_one", failing_insert)
+    with pytest.raises(RuntimeError):
+        client.post(f"/api/requests/{request['_id']}/comments", json={"content": "Hola"})
+
+    stored = run(db.requests.find_one({"_id": request["_id"]}))
+    assert stored["commentsCount"] == 0
+    assert stored["comments"] == []
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from app.core.due_reminders import DueDateReminders
+from app.core.email_queue import email_outbox
+from app.models.request import RequestStatus
+from app.models.user import UserRole
+from tests.factories import make_request, make_user
+
+
+def _seed(db, run):
+    owner = make_user(UserRole.CLIENT)
+    due = datetime.utcnow() + timedelta(hours=2)
+    requests = [make_request(owner["_id"], status=RequestStatus.DRAFT, dueDate=due) for _ in range(2)]
+
+    async def seed():
+        await db.users.insert_one(owner)
+        await db.requests.insert_many(requests)
+
+    run(seed())
+    return requests
+
+
+def test_sweep_reminds_once(db, run):
+    _seed(db, run)
+    reminders = DueDateReminders()
+
+    assert run(reminders.sweep()) == 2
+    assert run(reminders.sweep()) == 0
+    assert run(db.email_outbox.count_documents({})) == 1
+    assert run(db.requests.count_documents({"dueReminderBatch": {"$exists": True}})) == 0
+
+
+def test_failed_enqueue_is_retried(db, run, monkeypatch):
+    _seed(db, run)
+    reminders = DueDateReminders()
+    enqueue_many = email_outbox.enqueue_many
+
+    async def failing_enqueue(messages):
+        return 0
+
+    monkeypatch.setattr(email_outbox, "enqueue_many", failing_enqueue)
+    assert run(reminders.sweep()) == 0
+    assert run(db.requests.count_documents({"dueReminderFor": {"$exists": True}})) == 0
+
+    monkeypatch.setattr(email_outbox, "enqueue_many", enqueue_many)
+    assert run(reminders.sweep()) == 2
+    assert run(db.email_outbox.count_documents({})) == 1
+
+
+def test_crash_after_marking_does_not_resend(db, run, monkeypatch):
+    _seed(db, run)
+    reminders = DueDateReminders()
+    enqueue_many = email_outbox.enqueue_many
+
+    async def crash(messages):
+        raise SystemExit("proceso detenido")
+
+    monkeypatch.setattr(email_outbox, "enqueue_many", crash)
+    try:
+        run(reminders.sweep())
+    except SystemExit:
+        pass
+
+    monkeypatch.setattr(email_outbox, "enqueue_many", enqueue_many)
+    assert run(reminders.sweep()) == 0
+    assert run(db.email_outbox.count_documents({})) == 0
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import app.core.email_queue as email_queue
+from app.core.email_queue import EmailOutbox, OutboxStatus
+
+
+def test_deliver_keeps_state_of_a_newer_claim(db, run, monkeypatch):
+    monkeypatch.setattr(email_queue, "send_email", lambda **kwargs: True)
+    outbox = EmailOutbox()
+
+    async def scenario():
+        await outbox.enqueue("a@example.com", "Asunto", "texto", "<p>html</p>")
+        stale = (await outbox._claim_batch())[0]
+        # El lock vence y otro worker reclama el mensaje
+        await db.email_outbox.update_one(
+            {"_id": stale["_id"]}, {"$set": {"lockedUntil": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        fresh = (await outbox._claim_batch())[0]
+        await outbox._deliver(stale)
+        return fresh, await db.email_outbox.find_one({"_id": stale["_id"]})
+
+    fresh, stored = run(scenario())
+    assert stored["status"] == OutboxStatus.SENDING
+    assert stored["claimId"] == fresh["claimId"]
+
+
+def test_worker_survives_delivery_errors(db, run, monkeypatch):
+    monkeypatch.setattr(email_queue, "send_email", lambda **kwargs: True)
+    outbox = EmailOutbox(workers=1, poll_seconds=0.01)
+    deliver = outbox._deliver
+    calls = []
+
+    async def flaky_deliver(message):
+        calls.append(message["to"])
+        if len(calls) == 1:
+            raise RuntimeError("conexión perdida")
+        await deliver(message)
+
+    monkeypatch.setattr(outbox, "_deliver", flaky_deliver)
+
+    async def scenario():
+        await outbox.enqueue("a@example.com", "Asunto", "texto", "<p>html</p>")
+        await outbox.enqueue("b@example.com", "Asunto", "texto", "<p>html</p>")
+        outbox.start()
+        for _ in range(100):
+            if outbox.sent:
+                break
+            await asyncio.sleep(0.01)
+        running = not outbox._tasks[0].done()
+        await outbox.stop()
+        return running
+
+    assert run(scenario())
+    assert outbox.sent == 1
+    assert calls == ["a@example.com", "b@example.com"]
@@ -0,0 +1,19 @@
+import app.core.indexes as indexes
+from app.core.indexes import ensure_indexes
+
+
+def test_fresh_indexes_are_not_reported_unused(db, run, monkeypatch):
+    async def no_usage(collection):
+        # $indexStats sin operaciones para todos los índices existentes
+        return {name: 0 for name in await collection.index_information()}
+
+    monkeypatch.setattr(indexes, "_index_usage", no_usage)
+
+    first = run(ensure_indexes(db))
+    assert "requests.created_id" in first["created"]
+    assert first["unused"] == []
+
+    # En el siguiente arranque ya existen y, sin uso, sí son candidatos
+    second = run(ensure_indexes(db))
+    assert second["created"] == []
+    assert "requests.created_id" in second["unused"]
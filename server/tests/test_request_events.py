@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+import app.api.request_events as request_events_module
+from app.api.request_events import RequestEventHub
+from app.models.user import UserPublic, UserRole
+
+
+class FakeChangeStream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.changes:
+            await asyncio.Event().wait()  # Sin más cambios: esperar como un stream real
+        change = self.changes.pop(0)
+        if isinstance(change, asyncio.Event):
+            await change.wait()
+            change = self.changes.pop(0)
+        if isinstance(change, Exception):
+            raise change
+        return change
+
+
+class FakeDatabase:
+    def __init__(self, streams):
+        self.streams = streams
+        self.watch_calls = []
+
+    @property
+    def requests(self):
+        return self
+
+    def watch(self, pipeline, **options):
+        self.watch_calls.append(options)
+        return FakeChangeStream(self.streams.pop(0))
+
+
+def _insert(token):
+    return {
+        "_id": {"_data": token},
+        "operationType": "insert",
+        "documentKey": {"_id": ObjectId()},
+        "fullDocument": {"title": token, "status": "draft"},
+    }
+
+
+def test_hub_resets_subscribers_and_restarts_after_unexpected_errors(monkeypatch):
+    delivered = asyncio.Event()
+    database = FakeDatabase([
+        # El error llega después de que el primer evento fue leído
+        [_insert("1"), delivered, ValueError("evento no decodificable")],
+        [_insert("2")],
+    ])
+    monkeypatch.setattr(request_events_module, "get_database", lambda: database)
+    admin = UserPublic(id=str(ObjectId()), firstName="A", lastName="B", email="a@example.com",
+                       role=UserRole.ADMIN, createdAt=datetime.utcnow())
+
+    async def scenario():
+        hub = RequestEventHub(retry_seconds=0.01)
+        first = hub.subscribe(admin)
+        hub.start()
+        received = [await asyncio.wait_for(first.queue.get(), 1)]
+        delivered.set()
+        received.append(await asyncio.wait_for(first.queue.get(), 1))
+        second = hub.subscribe(admin)
+        after_restart = await asyncio.wait_for(second.queue.get(), 1)
+        running = not hub._task.done()
+        await hub.stop()
+        return hub, received, after_restart, running
+
+    hub, received, after_restart, running = asyncio.run(scenario())
+    assert received[0][0] == "1"
+    assert received[1] is None  # reset
+    assert after_restart[0] == "2"
+    assert running
+    assert hub.errors == 1
+    assert database.watch_calls[1]["resume_after"] == {"_data": "1"}
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.models.user import UserRole
+from tests.factories import make_user
+
+
+@pytest.fixture
+def users_queries(monkeypatch):
+    """Record every find/aggregate issued against the users collection."""
+    queries = []
+    original_find = mongomock.collection.Collection.find
+    original_aggregate = mongomock.collection.Collection.aggregate
+
+    def find(self, *args, **kwargs):
+        if self.name == "users":
+            queries.append(("find", args))
+        return original_find(self, *args, **kwargs)
+
+    def aggregate(self, *args, **kwargs):
+        if self.name == "users":
+            queries.append(("aggregate", args))
+        return original_aggregate(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "find", find)
+    monkeypatch.setattr(mongomock.collection.Collection, "aggregate", aggregate)
+    return queries
+
+
+@pytest.mark.parametrize("n", [1, 10])
+def test_get_request_hydrates_users_with_one_query(db, run, client, users_queries, n):
+    client_user = make_user(UserRole.CLIENT)
+    admins = [make_user(UserRole.ADMIN) for _ in range(n)]
+    now = datetime.utcnow()
+    request = {
+        "_id": ObjectId(),
+        "title": "Solicitud",
+        "description": "Descripción",
+        "amount": 100,
+        "status": "in_process",
+        "clientId": client_user["_id"],
+        "assignedTo": admins[0]["_id"],
+        "createdAt": now,
+        "updatedAt": now,
+        "version": 0,
+        "comments": [
+            {"_id": ObjectId(), "content": f"Comentario {i}", "createdAt": now,
+             "userId": admins[i]["_id"] if i % 2 else client_user["_id"]}
+            for i in range(n)
+        ],
+        "statusHistory": [
+            {"fromStatus": None if i == 0 else "draft", "toStatus": "in_process",
+             "changedAt": now - timedelta(hours=n - i), "changedBy": admins[i]["_id"]}
+            for i in range(n)
+        ],
+        "files": [
+            {"_id": ObjectId(), "filename": f"archivo{i}.pdf", "fileSize": 10,
+             "fileType": "application/pdf", "uploadedAt": now, "userId": admins[-1 - i]["_id"]}
+            for i in range(n)
+        ],
+    }
+
+    async def seed():
+        await db.users.insert_many([client_user, *admins])
+        await db.requests.insert_one(request)
+
+    run(seed())
+    users_queries.clear()
+
+    client.login(admins[0])
+    response = client.get(f"/api/requests/{request['_id']}")
+
+    assert response.status_code == 200, response.text
+    assert len(users_queries) == 1
+    data = response.json()["request"]
+    assert len(data["comments"]) == n
+    assert all(comment["user"] for comment in data["comments"])
+    assert all(change["changedBy"] for change in data["statusHistory"])
+    assert all(file["user"] for file in data["files"])
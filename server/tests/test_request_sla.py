@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.core.request_sla as request_sla
+from app.core.config import settings
+from app.core.request_sla import SLA_COLLECTION, SLA_EPOCH, SLA_STATE_ID, refresh_sla, sla_interval_stages
+from app.models.request import RequestStatus
+from tests.factories import make_request
+
+
+@pytest.fixture
+def windows(monkeypatch):
+    """
+    Record the (since, until) window of each refresh. The $merge stage is
+    left out because mongomock does not implement it.
+    """
+    calls = []
+
+    def pipeline(since, until):
+        calls.append((since, until))
+        return sla_interval_stages(since, until)
+
+    monkeypatch.setattr(request_sla, "sla_pipeline", pipeline)
+    return calls
+
+
+def _state(db, run):
+    return run(db[SLA_COLLECTION].find_one({"_id": SLA_STATE_ID}))
+
+
+def test_refresh_advances_watermark_window_by_window(db, run, windows):
+    before = datetime.utcnow() - timedelta(seconds=settings.SLA_WATERMARK_LAG_SECONDS, milliseconds=1)
+    first = run(refresh_sla(db))
+    after = datetime.utcnow() - timedelta(seconds=settings.SLA_WATERMARK_LAG_SECONDS)
+
+    assert windows == [(SLA_EPOCH, first)]
+    assert before <= first <= after
+    state = _state(db, run)
+    assert state["watermark"] == first
+    assert "claimOwner" not in state
+
+    run(db[SLA_COLLECTION].update_one({"_id": SLA_STATE_ID}, {"$set": {"watermark": first - timedelta(hours=1)}}))
+    second = run(refresh_sla(db))
+    assert windows[1] == (first - timedelta(hours=1), second)
+    assert _state(db, run)["watermark"] == second
+
+
+def test_refresh_inside_the_lag_is_a_noop(db, run, windows):
+    # Marca de agua posterior a now - lag (p. ej. tras aumentar el atraso)
+    watermark = datetime.utcnow().replace(microsecond=0)
+    run(db[SLA_COLLECTION].insert_one({"_id": SLA_STATE_ID, "watermark": watermark}))
+    assert run(refresh_sla(db)) == watermark
+    assert windows == []
+    assert "claimOwner" not in _state(db, run)
+
+
+def test_failed_refresh_keeps_the_watermark(db, run, windows, monkeypatch):
+    watermark = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    run(db[SLA_COLLECTION].insert_one({"_id": SLA_STATE_ID, "watermark": watermark}))
+
+    def failing_pipeline(since, until):
+        windows.append((since, until))
+        raise RuntimeError("fallo durante la agregación")
+
+    monkeypatch.setattr(request_sla, "sla_pipeline", failing_pipeline)
+    with pytest.raises(RuntimeError):
+        run(refresh_sla(db))
+    state = _state(db, run)
+    assert state["watermark"] == watermark
+    assert "claimOwner" not in state
+
+    monkeypatch.setattr(request_sla, "sla_pipeline", sla_interval_stages)
+    assert run(refresh_sla(db)) > watermark
+    assert windows[0][0] == watermark
+
+
+def test_refresh_skips_while_another_holds_the_lease(db, run, windows):
+    watermark = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    run(db[SLA_COLLECTION].insert_one({
+        "_id": SLA_STATE_ID, "watermark": watermark,
+        "claimOwner": "otro", "claimExpiresAt": datetime.utcnow() + timedelta(minutes=5),
+    }))
+    assert run(refresh_sla(db)) == watermark
+    assert windows == []
+    assert _state(db, run)["claimOwner"] == "otro"
+
+    # Lease vencido: se retoma desde la misma marca de agua
+    run(db[SLA_COLLECTION].update_one(
+        {"_id": SLA_STATE_ID}, {"$set": {"claimExpiresAt": datetime.utcnow() - timedelta(seconds=1)}}
+    ))
+    run(refresh_sla(db))
+    assert windows[0][0] == watermark
+
+
+def test_interval_stages_key_each_interval(db, run):
+    start = datetime(2026, 3, 2)
+
+    def change(to_status, hours, admin):
+        return {"toStatus": to_status, "changedAt": start + timedelta(hours=hours), "changedBy": admin}
+
+    request = make_request(None, statusHistory=[
+        change(RequestStatus.DRAFT, 0, "cliente"),
+        change(RequestStatus.IN_PROCESS, 1, "cliente"),
+        change(RequestStatus.IN_REVIEW, 5, "admin1"),
+        change(RequestStatus.APPROVED, 7, "admin2"),
+    ])
+    open_request = make_request(None, statusHistory=[change(RequestStatus.IN_PROCESS, 2, "cliente")])
+    run(db.requests.insert_many([request, open_request]))
+
+    async def aggregate(since):
+        return await db.requests.aggregate(sla_interval_stages(since, start + timedelta(days=1))).to_list(None)
+
+    intervals = sorted(run(aggregate(SLA_EPOCH)), key=lambda interval: interval["_id"]["position"])
+    assert intervals == [
+        {"_id": {"requestId": request["_id"], "position": 1}, "status": RequestStatus.IN_PROCESS,
+         "admin": "admin1", "month": "2026-03", "hours": 4.0},
+        {"_id": {"requestId": request["_id"], "position": 2}, "status": RequestStatus.IN_REVIEW,
+         "admin": "admin2", "month": "2026-03", "hours": 2.0},
+    ]
+    # Solo los intervalos cerrados después de la marca de agua
+    assert [interval["_id"]["position"] for interval in run(aggregate(start + timedelta(hours=6)))] == [2]
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+
+from app.api.responses import MongoJSONResponse
+
+
+def test_renders_non_string_keys():
+    admin = ObjectId()
+    content = {
+        "statusCounts": {None: 1, "draft": 2},
+        "byAdmin": {admin: {"count": 3, "last": datetime(2026, 3, 1)}},
+        "byMonth": [{2026: 4}],
+    }
+
+    body = orjson.loads(MongoJSONResponse(content).body)
+
+    assert body == {
+        "statusCounts": {"null": 1, "draft": 2},
+        "byAdmin": {str(admin): {"count": 3, "last": "2026-03-01T00:00:00"}},
+        "byMonth": [{"2026": 4}],
+    }